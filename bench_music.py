@@ -0,0 +1,183 @@
+import argparse
+import functools
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from music_data import apply_schema, cache_paths, load_dataset, FEATURE_COLUMNS
+from music_aggregates import (track_sums, item_sums, build_genre_cube, build_genre_artist_cube, build_track_cube, top_genres,
+                              genre_metrics, sunburst_leaves)
+from music_index import group_by_artist, ArtistIndex, FeatureIndex, TopItemsIndex
+from music_search import MusicSearchIndex
+from music_similar import FeatureNeighbors
+from music_downsample import downsample_points
+from music_insights import FeatureStats, HISTOGRAM_BINS
+from music_export import export_rows
+
+WORDS = ['love', 'night', 'dance', 'heart', 'fire', 'dream', 'summer', 'baby', 'rain', 'gold',
+         'blue', 'home', 'light', 'wild', 'young', 'forever', 'sky', 'money', 'city', 'girl']
+
+
+# Random dataset with the same columns and rough shape as the Spotify/YouTube export:
+# a skewed artist popularity, one genre per artist, ~8 tracks per album and some missing counters.
+def synthetic_dataset(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    n_artists = max(n_rows // 20, 10)
+    n_albums = max(n_rows // 8, 1)
+    n_tracks = max(n_rows * 4 // 5, 1)
+
+    artist_names = np.array([f"Artist {i}" for i in range(n_artists)], dtype=object)
+    genre_names = np.array([f"Genre {i}" for i in range(31)], dtype=object)
+    track_names = np.array([f"{WORDS[i % len(WORDS)]} {WORDS[(i // len(WORDS)) % len(WORDS)]} {i}"
+                            for i in range(n_tracks)], dtype=object)
+
+    artist_codes = (rng.power(0.3, n_rows) * n_artists).astype(np.int64)
+    artist_genre = rng.integers(0, len(genre_names), n_artists)
+    track_codes = rng.integers(0, n_tracks, n_rows)
+    album_codes = rng.integers(0, n_albums, n_rows)
+
+    df = pd.DataFrame({
+        'Artist': artist_names[artist_codes],
+        'Url_spotify': np.char.add('https://open.spotify.com/artist/', artist_codes.astype(str)).astype(object),
+        'Track': track_names[track_codes],
+        'Album': np.char.add('Album ', album_codes.astype(str)).astype(object),
+        'Url_youtube': np.char.add('https://www.youtube.com/watch?v=', np.arange(n_rows).astype(str)).astype(object),
+        'Views': rng.lognormal(15, 2, n_rows).round(),
+        'Likes': rng.lognormal(11, 2, n_rows).round(),
+        'Comments': rng.lognormal(7, 2, n_rows).round(),
+        'Stream': rng.lognormal(17, 1.5, n_rows).round(),
+        'Genre': genre_names[artist_genre[artist_codes]],
+        'Artist Cleaned': artist_names[artist_codes],
+    })
+    for feature in FEATURE_COLUMNS:
+        df[feature] = rng.random(n_rows)
+    df['Key'] = rng.integers(0, 12, n_rows).astype(float)
+    df['Loudness'] = -60 * rng.random(n_rows)
+    df['Tempo'] = 60 + 140 * rng.random(n_rows)
+
+    # Missing values, as in the real export
+    for col in ['Views', 'Likes', 'Comments', 'Stream']:
+        df.loc[rng.random(n_rows) < 0.02, col] = np.nan
+    return df
+
+
+# Run fn `repeat` times; returns the result, median wall time (ms) and peak traced memory (MB).
+# tracemalloc slows every allocation, and not evenly across steps, so the timed runs are
+# untraced and the peak comes from one more, traced run. setup() runs untimed before each run.
+def measure(fn, repeat=5, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, statistics.median(times), peak / 2 ** 20
+
+
+def report(n_rows, name, ms, peak_mb):
+    print(f"{n_rows:>10,}  {name:<28} {ms:>10.2f} ms {peak_mb:>10.1f} MB")
+
+
+# The frame the indexes are built from; the raw frame is passed in rather than closed
+# over so bench() can drop it once this has run
+def schema_frame(raw):
+    return group_by_artist(apply_schema(raw.copy()))
+
+
+def bench(n_rows, repeat=5, with_io=False):
+    raw = synthetic_dataset(n_rows)
+
+    # One-time build steps
+    if with_io:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.csv')
+            raw.to_csv(path, index=False, encoding='ISO-8859-1')
+            # Every cold load starts without a cache
+            clear_cache = lambda: [os.remove(cache) for cache in cache_paths(path) if os.path.exists(cache)]
+            _, ms, mb = measure(lambda: load_dataset(path), 1, setup=clear_cache)
+            report(n_rows, 'load (csv -> cache)', ms, mb)
+            _, ms, mb = measure(lambda: load_dataset(path), repeat)
+            report(n_rows, 'load (cache hit)', ms, mb)
+
+    df, ms, mb = measure(functools.partial(schema_frame, raw), 1)
+    report(n_rows, 'schema + group by artist', ms, mb)
+    del raw
+
+    sums, ms, mb = measure(lambda: track_sums(df), 1)
+    report(n_rows, 'track sums', ms, mb)
+    (genre_cube, artist_cube, track_cube), ms, mb = measure(
+        lambda: (build_genre_cube(sums), build_genre_artist_cube(sums), build_track_cube(sums)), 1)
+    report(n_rows, 'build aggregate cubes', ms, mb)
+    search_index, ms, mb = measure(lambda: MusicSearchIndex(df), 1)
+    report(n_rows, 'build search index', ms, mb)
+    artist_index, ms, mb = measure(lambda: ArtistIndex(df), 1)
+    report(n_rows, 'build artist index', ms, mb)
+    top_items, ms, mb = measure(lambda: TopItemsIndex(item_sums(df)), 1)
+    report(n_rows, 'build top items index', ms, mb)
+    feature_index, ms, mb = measure(lambda: FeatureIndex(df, FEATURE_COLUMNS), 1)
+    report(n_rows, 'build feature index', ms, mb)
+    feature_stats, ms, mb = measure(lambda: FeatureStats.from_frame(df), 1)
+    report(n_rows, 'build feature stats', ms, mb)
+    similar_index, ms, mb = measure(lambda: FeatureNeighbors.from_frame(df, FEATURE_COLUMNS), 1)
+    report(n_rows, 'build similarity index', ms, mb)
+
+    # Per-view costs, as paid on every rerun
+    artists = artist_index.artists[:3]
+    views = {
+        'sunburst': lambda: sunburst_leaves(artist_cube, track_cube, top_genres(genre_cube, 10), leaf_cap=10),
+        'dual-axis': lambda: genre_metrics(genre_cube, 'mean', top_genres(genre_cube, 10), ['Views', 'Likes']),
+        'scatter': lambda: genre_metrics(genre_cube, 'sum', genre_cube['Genre'], ['Likes', 'Comments', 'Views']),
+        'artist comparison': lambda: [top_items.top(artist, 'Track', 'Likes', 10) for artist in artists],
+        'track & album': lambda: top_items.ranked(artists[0], 'Album', 'Stream'),
+        'feature insights': lambda: (feature_stats.correlation(), feature_stats.genre_means(),
+                                     feature_index.histogram('Tempo', HISTOGRAM_BINS)),
+        'range filter': lambda: feature_index.page('Energy', 0.2, 0.6, page=0, page_size=100, descending=True),
+        'search': lambda: search_index.search('love', limit=200),
+        'ranked search (typo)': lambda: search_index.ranked_search('lvoe nihgt', limit=50),
+        'similar tracks': lambda: similar_index.similar(n_rows // 2, k=10),
+        'similar tracks (brute force)': lambda: similar_index.similar(n_rows // 2, k=10, exact=True),
+        'scatter downsample (all tracks)': lambda: downsample_points(df, 'Energy', 'Valence', size='Stream'),
+    }
+    for name, view in views.items():
+        _, ms, mb = measure(view, repeat)
+        report(n_rows, name, ms, mb)
+
+    # Exports of a whole range (every row, sorted), written in chunks
+    fetch_rows = lambda row_ids, columns: df[columns].iloc[row_ids]
+    row_ids = feature_index.range_rows('Energy', 0, 1, descending=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ('CSV', 'Parquet'):
+            _, ms, mb = measure(lambda: export_rows(fetch_rows, row_ids, os.path.join(tmp, 'export'), fmt,
+                                                    ['Track', 'Artist Cleaned', 'Album', 'Genre', 'Energy']), 1)
+            report(n_rows, f'export range ({fmt})', ms, mb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the music analytics views on synthetic data")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="dataset sizes to benchmark (e.g. 10000 1000000 10000000)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per view (median is reported)")
+    parser.add_argument('--io', action='store_true', help="also time the CSV -> Parquet cache load")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'step':<28} {'time':>13} {'peak mem':>13}")
+    for n_rows in args.rows:
+        bench(n_rows, args.repeat, args.io)
+
+
+if __name__ == '__main__':
+    main()
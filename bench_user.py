@@ -0,0 +1,114 @@
+import os
+import time
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from user_db import UserDatabase
+from user_hash import HASH_WORKERS, PasswordHasher
+from user_import import IMPORT_COLUMNS, IMPORT_HASHER, import_users
+
+# Cost settings compared by default, cheapest first
+HASHER_SETTINGS = [
+    'pbkdf2_sha256:iterations=200000',
+    'pbkdf2_sha256:iterations=600000',
+    'scrypt:n=16384,r=8,p=1',
+    'scrypt:n=32768,r=8,p=1',
+]
+
+
+# A temporary user database with n_users accounts hashed with the given hasher
+def seed_users(db, hasher, n_users):
+    hashes = hasher.hash_many([f"password {i}" for i in range(n_users)])
+    with db.write() as conn:
+        conn.executemany('INSERT INTO users (username, email, role, password) VALUES (?, ?, ?, ?)',
+                         [(f"user{i}", f"user{i}@example.com", 'user', hashes[i]) for i in range(n_users)])
+
+
+# A burst of logins from `clients` concurrent sessions, as login_user() runs them: one
+# lookup on the pooled connection, one hash check on the worker pool. Returns the
+# logins per second and every login's latency in milliseconds.
+def login_burst(db, hasher, n_users, clients, logins):
+    latencies = []
+    lock = threading.Lock()
+    rng = np.random.default_rng(0)
+    users = rng.integers(0, n_users, logins)
+
+    def session(part):
+        times = []
+        for i in part:
+            start = time.perf_counter()
+            row = db.fetch_one('SELECT id, password FROM users WHERE username = ?', (f"user{i}",))
+            matches, _ = hasher.check(f"password {i}", row[1])
+            assert matches
+            times.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(times)
+
+    threads = [threading.Thread(target=session, args=(part,)) for part in np.array_split(users, clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return logins / (time.perf_counter() - start), np.array(latencies)
+
+
+# Bulk import of n_rows new users into a fresh database; returns the seconds taken
+def bench_import(n_rows, hasher_spec, workers):
+    df = pd.DataFrame({column: [f"{column} {i}" for i in range(n_rows)] for column in IMPORT_COLUMNS})
+    df['username'] = [f"user{i}" for i in range(n_rows)]
+    df['email'] = [f"user{i}@example.com" for i in range(n_rows)]
+    df['role'] = 'user'
+    with tempfile.TemporaryDirectory() as tmp:
+        db = UserDatabase(os.path.join(tmp, 'users.db')).migrate()
+        start = time.perf_counter()
+        report = import_users(db, df, hasher_spec, workers)
+        seconds = time.perf_counter() - start
+        db.close()
+    assert (report['status'] == 'imported').all()
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput and latency per password hasher setting")
+    parser.add_argument('--hashers', nargs='+', default=HASHER_SETTINGS,
+                        help="settings to compare, as for USER_PASSWORD_HASHER")
+    parser.add_argument('--workers', type=int, default=HASH_WORKERS, help="hash worker threads (USER_HASH_WORKERS)")
+    parser.add_argument('--clients', type=int, default=32, help="concurrent login sessions")
+    parser.add_argument('--logins', type=int, default=200, help="logins per setting")
+    parser.add_argument('--users', type=int, default=100, help="accounts in the test database")
+    parser.add_argument('--import-rows', type=int, default=0, help="also time a bulk import of this many users")
+    parser.add_argument('--import-hasher', default=IMPORT_HASHER,
+                        help="hasher setting for the import (USER_IMPORT_HASHER)")
+    args = parser.parse_args()
+
+    print(f"{args.workers} hash workers, {args.clients} concurrent sessions, {args.logins} logins per setting")
+    print(f"{'hasher':<34} {'hash':>9} {'logins/s':>9} {'p50':>10} {'p99':>10}")
+    for spec in args.hashers:
+        hasher = PasswordHasher(spec, args.workers)
+        with tempfile.TemporaryDirectory() as tmp:
+            db = UserDatabase(os.path.join(tmp, 'users.db')).migrate()
+            seed_users(db, hasher, args.users)
+
+            start = time.perf_counter()
+            hasher.hash('password')
+            single = (time.perf_counter() - start) * 1000
+
+            rate, latencies = login_burst(db, hasher, args.users, args.clients, args.logins)
+            db.close()
+        hasher.close()
+        print(f"{spec:<34} {single:>6.1f} ms {rate:>9.1f} {np.percentile(latencies, 50):>7.1f} ms "
+              f"{np.percentile(latencies, 99):>7.1f} ms")
+
+    if args.import_rows:
+        seconds = bench_import(args.import_rows, args.import_hasher, args.workers)
+        print(f"import of {args.import_rows:,} users with {args.import_hasher}: {seconds:.1f} s "
+              f"({args.import_rows / seconds:,.0f} users/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import os
+import time
+import logging
+import argparse
+import tempfile
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from user_hash import DEFAULT_HASHER
+
+# Flows a simulated user can run, as on the login, registration and forgot-password pages
+FLOWS = ['login', 'register', 'forgot']
+# How long to wait for the outbox to send the verification emails after the load
+DRAIN_SECONDS = 60
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user.py')
+
+
+def seed_account(i):
+    return {
+        'first_name': 'Load', 'last_name': f"Test {i}", 'username': f"load{i}", 'email': f"load{i}@example.com",
+        'role': 'user', 'password': f"password {i}",
+        'security_question_1': "What is your favorite food?", 'security_answer_1': 'pizza',
+        'security_question_2': "What is your favorite color?", 'security_answer_2': 'blue',
+    }
+
+
+# Outcome of a finished AppTest run: 'lock' if SQLite reported a busy/locked database,
+# 'error' for any other exception, else 'ok' or 'failed' as the flow's check says
+def outcome(at, succeeded):
+    errors = [str(e.value) for e in at.exception]
+    if any('locked' in error or 'busy' in error for error in errors):
+        return 'lock'
+    if errors:
+        return 'error'
+    return 'ok' if succeeded else 'failed'
+
+
+def run_login(AppTest, account, _):
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    at.text_input[0].set_value(account['username'])
+    at.text_input[1].set_value(account['password'])
+    next(b for b in at.button if b.label == "Login").click().run()
+    return outcome(at, at.session_state['page'] == 'application')
+
+
+def run_register(AppTest, account, tag):
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.query_params['page'] = 'register'
+    at.run()
+    fields = {
+        "First Name": account['first_name'], "Last Name": account['last_name'],
+        "Username": f"new{tag}", "Email": f"new{tag}@example.com",
+        "Password": account['password'], "Confirm Password": account['password'],
+        "Answer to Security Question 1": 'pizza', "Answer to Security Question 2": 'blue',
+    }
+    for text_input in at.text_input:
+        if text_input.label in fields:
+            text_input.set_value(fields[text_input.label])
+    next(b for b in at.button if b.label == "Register").click().run()
+    return outcome(at, any('successfully registered' in s.value for s in at.success))
+
+
+def run_forgot(AppTest, account, _):
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.query_params['page'] = 'forgot_password'
+    at.run()
+    at.text_input[0].set_value(account['email'])
+    at.button[0].click().run()
+    if not at.session_state['submitted_email']:
+        return outcome(at, False)
+    # The questions form appears on the next rerun
+    at.run()
+    at.text_input[0].set_value(account['security_answer_1'])
+    at.text_input[1].set_value(account['security_answer_2'])
+    at.button[0].click().run()
+    return outcome(at, any('verification code has been sent' in s.value for s in at.success))
+
+
+RUNNERS = {'login': run_login, 'register': run_register, 'forgot': run_forgot}
+
+
+# One simulated user in its own process (AppTest runs one script at a time per
+# process), sharing the database file and the SMTP stand-in with the others: runs
+# the flows in turn until `seconds` have passed and reports (flow, ms, outcome) per run
+def session(index, flows, seconds, start_barrier, results):
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest outside a server logs a bare-mode warning on every run
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').addFilter(
+        lambda record: 'missing ScriptRunContext' not in record.getMessage())
+    account = seed_account(index)
+    # Warm up imports and the per-process connection pool, hasher and outbox worker
+    AppTest.from_file(APP_PATH, default_timeout=120).run()
+    start_barrier.wait()
+
+    timings = []
+    deadline = time.perf_counter() + seconds
+    run = 0
+    while time.perf_counter() < deadline:
+        flow = flows[run % len(flows)]
+        start = time.perf_counter()
+        try:
+            result = RUNNERS[flow](AppTest, account, f"{index}_{run}")
+        except Exception as e:
+            result = 'lock' if 'locked' in str(e) or 'busy' in str(e) else 'error'
+        timings.append((flow, (time.perf_counter() - start) * 1000, result))
+        run += 1
+    results.put(timings)
+
+    # Keep this process's outbox worker alive until every queued email has gone out
+    from user_db import DB_PATH, UserDatabase
+    from user_mail import Outbox
+    db = UserDatabase(DB_PATH, pool_size=1)
+    outbox = Outbox(db)
+    deadline = time.monotonic() + DRAIN_SECONDS
+    while outbox.stats()['queued'] and time.monotonic() < deadline:
+        time.sleep(0.5)
+    db.close()
+
+
+# Throughput, latency percentiles and failures per flow
+def summarize(timings, seconds):
+    df = pd.DataFrame(timings, columns=['flow', 'ms', 'outcome'])
+    rows = []
+    for flow, runs in df.groupby('flow', sort=False):
+        counts = runs['outcome'].value_counts()
+        rows.append({
+            'flow': flow,
+            'runs': len(runs),
+            'ok': counts.get('ok', 0),
+            'failed': counts.get('failed', 0),
+            'lock errors': counts.get('lock', 0),
+            'other errors': counts.get('error', 0),
+            'ok/s': counts.get('ok', 0) / seconds,
+            'p50 ms': np.percentile(runs['ms'], 50),
+            'p95 ms': np.percentile(runs['ms'], 95),
+            'p99 ms': np.percentile(runs['ms'], 99),
+        })
+    return pd.DataFrame(rows).set_index('flow')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test user.py's login, registration and forgot-password flows")
+    parser.add_argument('--sessions', type=int, default=16, help="concurrent simulated users (one process each)")
+    parser.add_argument('--seconds', type=float, default=30, help="how long every user keeps running flows")
+    parser.add_argument('--flows', nargs='+', choices=FLOWS, default=FLOWS, help="flows each user runs in turn")
+    parser.add_argument('--hasher', default=DEFAULT_HASHER, help="password hasher setting (USER_PASSWORD_HASHER)")
+    parser.add_argument('--smtp-delay', type=float, default=0.05, help="seconds the SMTP stand-in takes per message")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        from user_mail import LocalSMTPServer
+        smtp = LocalSMTPServer(delay=args.smtp_delay).start()
+
+        # Every session process reads these at import, like a server started with them
+        os.environ.update({
+            'USER_DB_PATH': os.path.join(tmp, 'users.db'),
+            'USER_PASSWORD_HASHER': args.hasher,
+            'USER_SMTP_HOST': '127.0.0.1',
+            'USER_SMTP_PORT': str(smtp.port),
+            'USER_SMTP_STARTTLS': '0',
+            'USER_SMTP_USER': '',
+        })
+        from user_db import UserDatabase
+        from user_import import import_users
+        from user_mail import Outbox
+        db = UserDatabase(os.environ['USER_DB_PATH']).migrate()
+        print(f"Seeding {args.sessions} accounts with {args.hasher}...")
+        import_users(db, pd.DataFrame([seed_account(i) for i in range(args.sessions)]), args.hasher)
+
+        context = multiprocessing.get_context('spawn')
+        start_barrier = context.Barrier(args.sessions + 1)
+        results = context.Queue()
+        processes = [context.Process(target=session, args=(i, args.flows, args.seconds, start_barrier, results))
+                     for i in range(args.sessions)]
+        for process in processes:
+            process.start()
+        print(f"Starting {args.sessions} sessions...")
+        start_barrier.wait()
+        started = time.perf_counter()
+        timings = [timing for _ in processes for timing in results.get()]
+        elapsed = time.perf_counter() - started
+
+        pd.set_option('display.width', 200)
+        print(f"\n{args.sessions} sessions for {elapsed:.1f} s, flows: {', '.join(args.flows)}")
+        print(summarize(timings, elapsed).round(1).to_string())
+        for process in processes:
+            process.join()
+
+        # Verification emails are sent in the background; the sessions wait for them to drain
+        stats = Outbox(db).stats()
+        print(f"\nOutbox: {stats['sent']:,} sent, {stats['queued']:,} still queued, {stats['failed']:,} failed; "
+              f"send latency p50 {stats['latency_p50_s']:.2f} s, p95 {stats['latency_p95_s']:.2f} s; "
+              f"SMTP stand-in received {len(smtp.messages):,} messages over {smtp.sessions:,} connections")
+        smtp.shutdown()
+        smtp.server_close()
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
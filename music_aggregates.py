@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+from music_data import COUNT_COLUMNS, key_hashes
+
+TRACK_KEYS = ['Genre', 'Artist Cleaned', 'Track']
+ITEM_KEYS = ['Artist Cleaned', 'Album', 'Track']
+COUNT_SUFFIX = '_count'
+ROWS_COLUMN = 'Rows'
+
+
+# Per (Genre, Artist, Track) sums and non-null counts of every counter.
+# All the cubes below are derived from this table, and tables built from separate
+# chunks of the dataset can be combined with merge_track_sums().
+def track_sums(df):
+    grouped = df.groupby(TRACK_KEYS, observed=True, dropna=False)
+    # Sums are kept as floats whatever the integer type of the counts
+    sums = grouped[COUNT_COLUMNS].sum().astype('float64')
+    counts = grouped[COUNT_COLUMNS].count().add_suffix(COUNT_SUFFIX)
+    sums = sums.join(counts)
+    sums[ROWS_COLUMN] = grouped.size()
+    sums = sums.reset_index()
+    for key in TRACK_KEYS:
+        # Plain strings so tables from different chunks line up
+        sums[key] = sums[key].astype(object)
+    return sums
+
+
+def merge_track_sums(tables):
+    combined = pd.concat(tables, ignore_index=True)
+    return combined.groupby(TRACK_KEYS, sort=False, dropna=False).sum().reset_index()
+
+
+# Per (Artist, Album, Track) counter sums, the input of music_index.TopItemsIndex.
+# Tables built from separate chunks are combined with merge_item_sums().
+def item_sums(df):
+    sums = df.groupby(ITEM_KEYS, observed=True, dropna=False)[COUNT_COLUMNS].sum().astype('float64').reset_index()
+    for key in ITEM_KEYS:
+        sums[key] = sums[key].astype(object)
+    return sums
+
+
+def merge_item_sums(tables):
+    combined = pd.concat(tables, ignore_index=True)
+    return combined.groupby(ITEM_KEYS, sort=False, dropna=False).sum().reset_index()
+
+
+# Hash of each sums row's (Genre, Artist, Track) key; keep it with the table for update_track_sums()
+def track_key_hashes(sums):
+    return key_hashes(sums, TRACK_KEYS)
+
+
+# Net change of the track sums when `removed_rows` are replaced by `added_rows`
+def track_sums_change(removed_rows, added_rows):
+    removed = track_sums(removed_rows)
+    numeric = removed.columns.difference(TRACK_KEYS)
+    removed[numeric] = -removed[numeric]
+    return merge_track_sums([removed, track_sums(added_rows)])
+
+
+# Apply a change from track_sums_change() to a sums table without regrouping it:
+# tracks already present are adjusted in place (found through the key hashes),
+# new tracks are appended and tracks left without rows are dropped
+def update_track_sums(sums, change, keys=None):
+    keys = track_key_hashes(sums) if keys is None else keys
+    change_keys = track_key_hashes(change)
+    order = np.argsort(keys, kind='stable')
+    at = np.searchsorted(keys, change_keys, sorter=order).clip(max=max(len(keys) - 1, 0))
+    found = keys[order[at]] == change_keys if len(keys) else np.zeros(len(change), dtype=bool)
+    positions = order[at[found]]
+
+    sums = sums.copy()
+    for col in change.columns.difference(TRACK_KEYS):
+        values = sums[col].to_numpy(copy=True)
+        values[positions] += change.loc[found, col].to_numpy(dtype=values.dtype)
+        sums[col] = values
+    sums = pd.concat([sums, change[~found]], ignore_index=True)
+    return sums[sums[ROWS_COLUMN] > 0].reset_index(drop=True)
+
+
+# Rows of a cube whose (Genre, Artist Cleaned) is one of the given pairs
+def pair_mask(cube, pairs):
+    keys = ['Genre', 'Artist Cleaned']
+    mask = cube['Artist Cleaned'].isin(pairs['Artist Cleaned']).to_numpy(copy=True)
+    candidates = cube.loc[mask, keys].astype(object)
+    mask[mask] = candidates.merge(pairs.assign(_hit=True), on=keys, how='left')['_hit'].notna().to_numpy()
+    return mask
+
+
+# Per-genre aggregate cube: unique track count plus sum/mean of every counter.
+# Built once per dataset version, so the Overview charts only slice ~31 rows.
+def build_genre_cube(sums):
+    grouped = sums.dropna(subset=['Genre']).groupby('Genre')
+
+    cube = grouped['Track'].nunique().rename('Tracks').to_frame()
+    totals = grouped[COUNT_COLUMNS + [col + COUNT_SUFFIX for col in COUNT_COLUMNS]].sum()
+    for col in COUNT_COLUMNS:
+        counts = totals[col + COUNT_SUFFIX]
+        cube[f"{col}_sum"] = totals[col]
+        cube[f"{col}{COUNT_SUFFIX}"] = counts
+        # Same result as groupby().mean() on the rows: NaNs are left out of the average
+        cube[f"{col}_mean"] = totals[col] / counts.where(counts > 0)
+
+    # Keep the genres ordered by track count so "top N genres" is just head(N)
+    cube = cube.reset_index().sort_values('Tracks', ascending=False, kind='stable')
+    cube['Genre'] = cube['Genre'].astype(str)
+    return cube.reset_index(drop=True)
+
+
+# Genre x artist cube with counter sums and the artist's stream rank inside its genre
+def build_genre_artist_cube(sums):
+    grouped = sums.dropna(subset=['Genre', 'Artist Cleaned']).groupby(['Genre', 'Artist Cleaned'])
+
+    cube = grouped['Track'].nunique().rename('Tracks').to_frame()
+    cube = cube.join(grouped[COUNT_COLUMNS].sum())
+    cube = cube.reset_index()
+    cube['Genre'] = cube['Genre'].astype(str)
+    cube['Artist Cleaned'] = cube['Artist Cleaned'].astype(str)
+
+    cube['Rank'] = cube.groupby('Genre')['Stream'].rank(method='first', ascending=False)
+    return cube
+
+
+# Patch the three cubes with a change from track_sums_change(); `old_sums`/`sums` are the
+# track sums before and after it. Only the (genre, artist) pairs in the change are
+# rebuilt, and the genre cube is adjusted by the change itself, so the cost follows
+# the size of the update rather than of the dataset. Rebuilt track cube rows are
+# appended rather than sorted into place.
+def update_cubes(genre_cube, artist_cube, track_cube, old_sums, sums, change):
+    keys = ['Genre', 'Artist Cleaned']
+    pairs = change[keys].dropna().drop_duplicates().astype(object)
+    part = sums[pair_mask(sums, pairs)]
+
+    # Artist ranks are per genre, so they are recomputed over the (small) artist cube
+    artist_cube = pd.concat([artist_cube[~pair_mask(artist_cube, pairs)], build_genre_artist_cube(part)])
+    artist_cube = artist_cube.sort_values(keys, kind='stable').reset_index(drop=True)
+    artist_cube['Rank'] = artist_cube.groupby('Genre')['Stream'].rank(method='first', ascending=False)
+
+    track_cube = pd.concat([track_cube[~pair_mask(track_cube, pairs)], build_track_cube(part)], ignore_index=True)
+
+    # Genre totals move by the change; the track count by the (genre, track) pairs
+    # that appeared or disappeared
+    totals = change.dropna(subset=['Genre']).groupby('Genre')[
+        COUNT_COLUMNS + [col + COUNT_SUFFIX for col in COUNT_COLUMNS]].sum()
+    tracks = change['Track'].dropna().unique()
+
+    def genre_tracks(table):
+        present = table[table['Track'].isin(tracks) & table['Genre'].isin(totals.index)]
+        return present.dropna(subset=['Track'])[['Genre', 'Track']].drop_duplicates().groupby('Genre').size()
+
+    cube = genre_cube.set_index('Genre').reindex(genre_cube['Genre'].tolist() +
+                                                [g for g in totals.index if g not in set(genre_cube['Genre'])])
+    cube = cube.fillna({col: 0 for col in cube.columns if not col.endswith('_mean')})
+    changed = totals.index
+    cube.loc[changed, 'Tracks'] += genre_tracks(sums).reindex(changed, fill_value=0)
+    cube.loc[changed, 'Tracks'] -= genre_tracks(old_sums).reindex(changed, fill_value=0)
+    for col in COUNT_COLUMNS:
+        counts = f"{col}{COUNT_SUFFIX}"
+        cube.loc[changed, f"{col}_sum"] += totals[col]
+        cube.loc[changed, counts] += totals[counts]
+        cube[f"{col}_mean"] = cube[f"{col}_sum"] / cube[counts].where(cube[counts] > 0)
+    cube = cube[cube['Tracks'] > 0].reset_index()
+    cube['Tracks'] = cube['Tracks'].astype('int64')
+    genre_cube = cube.sort_values(['Tracks', 'Genre'], ascending=[False, True], kind='stable').reset_index(drop=True)
+    return genre_cube, artist_cube, track_cube
+
+
+# Names of the N genres with the most tracks
+def top_genres(genre_cube, n):
+    return genre_cube['Genre'].head(n).tolist()
+
+
+# Slice the genre cube down to the chosen genres and one aggregation ("sum" or "mean").
+# Columns come back under their plain names (Views, Likes, ...) for plotting.
+def genre_metrics(genre_cube, how, genres=None, metrics=COUNT_COLUMNS):
+    view = genre_cube
+    if genres is not None:
+        view = view[view['Genre'].isin(list(genres))]
+    columns = {f"{col}_{how}": col for col in metrics}
+    return view[['Genre', 'Tracks'] + list(columns)].rename(columns=columns)
+
+
+# Track-level stream sums per genre/artist, ranked by streams inside each artist.
+# This is everything the sunburst needs, so the chart never touches raw rows.
+def build_track_cube(sums):
+    cube = sums.dropna(subset=TRACK_KEYS)[TRACK_KEYS + ['Stream']].copy()
+    cube['Genre'] = cube['Genre'].astype(str)
+    cube['Artist Cleaned'] = cube['Artist Cleaned'].astype(str)
+
+    cube = cube.sort_values(['Genre', 'Artist Cleaned', 'Stream'], ascending=[True, True, False], kind='stable')
+    cube['Rank'] = cube.groupby(['Genre', 'Artist Cleaned']).cumcount() + 1
+    return cube.reset_index(drop=True)
+
+
+# Leaf rows (Genre, Artist Cleaned, Track, Stream) for the sunburst chart.
+# Only the top artists of each selected genre are kept, and each artist shows at
+# most `leaf_cap` tracks; the remaining tracks are collapsed into one "Other" leaf.
+def sunburst_leaves(artist_cube, track_cube, genres, top_artists=15, leaf_cap=10):
+    keys = ['Genre', 'Artist Cleaned']
+    artists = artist_cube[(artist_cube['Rank'] <= top_artists) & artist_cube['Genre'].isin(genres)][keys]
+    tracks = track_cube[track_cube['Genre'].isin(genres)].merge(artists, on=keys, how='inner')
+
+    kept = tracks[tracks['Rank'] <= leaf_cap]
+    other = tracks[tracks['Rank'] > leaf_cap].groupby(keys, sort=False)['Stream'].sum().reset_index()
+    other['Track'] = 'Other'
+
+    columns = keys + ['Track', 'Stream']
+    return pd.concat([kept[columns], other[columns]], ignore_index=True)
@@ -0,0 +1,116 @@
+import os
+import streamlit as st
+from music_data import source_signature
+from music_shared import load_shared
+from music_updates import delta_signature, with_updates
+from music_results import ResultCache, DEFAULT_BUDGET_MB
+from music_downsample import render_mode
+
+# State shared by every page: the loaded dataset and the result cache. Both are built
+# once per process and reused by every session and rerun.
+
+# Each page lives in its own module, imported the first time the page is opened, so
+# plotly and the page code are only loaded by the pages that need them
+PAGES = {
+    "Overview": 'music_page_overview',
+    "Artist": 'music_page_artist',
+    "Track & Album": 'music_page_tracks',
+    "Variables": 'music_page_variables',
+    "Feature Insights": 'music_page_insights',
+    "Music Search": 'music_page_search',
+}
+
+# Set MUSIC_DATA_PATH to point the app at another export
+file_path = os.environ.get('MUSIC_DATA_PATH', "E:\\Intern\\Streamlit\\Spotify_Youtube.csv")
+
+
+# Set MUSIC_OUT_OF_CORE=1 for exports larger than RAM: the CSV is ingested in chunks,
+# only the aggregates and indexes stay in memory and raw rows are read on demand
+out_of_core = os.environ.get('MUSIC_OUT_OF_CORE') == '1'
+
+
+# Parse the CSV once into a typed Parquet cache, build the indexes and publish them as
+# read-only memory-mapped Arrow/NumPy buffers. All sessions and server processes share
+# those pages, so memory stays flat as users are added.
+# The signature argument makes Streamlit reload when the source file changes.
+@st.cache_resource
+def load_data(path, signature):
+    return load_shared(path)
+
+
+# Chunked ingest into a Parquet row store plus in-memory summaries
+@st.cache_resource
+def load_ingested_data(path, signature):
+    from music_ingest import load_ingested
+    return load_ingested(path)
+
+
+# Rows added with `python music_updates.py` are layered over the loaded dataset;
+# only this small step reruns after an update
+@st.cache_resource(max_entries=2)
+def load_updated_data(path, signature, updates_signature, out_of_core):
+    if out_of_core:
+        base = load_ingested_data(path, signature)
+    else:
+        base = load_data(path, signature)
+    return with_updates(base, path)
+
+
+# The dataset as of this rerun (two stat calls once it is loaded)
+def current_dataset():
+    return load_updated_data(file_path, source_signature(file_path), delta_signature(file_path), out_of_core)
+
+
+# Computed view results shared by every session, in an LRU cache bounded by
+# MUSIC_RESULT_CACHE_MB (default 256 MB of cached frames)
+@st.cache_resource
+def result_cache():
+    return ResultCache(int(os.environ.get('MUSIC_RESULT_CACHE_MB', DEFAULT_BUDGET_MB)) * 2 ** 20)
+
+
+# Result of compute() for this view and widget state, reused while the genres/artists
+# it depends on are unchanged. Cached results are shared, so never modify them in place.
+def cached_view(view, compute, genres=None, artists=None, **state):
+    version = current_dataset().view_version(genres=genres, artists=artists)
+    return result_cache().get(ResultCache.key(view, version, genres=genres, artists=artists, **state), compute)
+
+
+# How many points a scatter chart draws and how many it stands for
+def point_caption(drawn, total):
+    renderer = 'WebGL' if render_mode(drawn) == 'webgl' else 'SVG'
+    if drawn < total:
+        st.caption(f"Showing {drawn:,} of {total:,} points ({renderer}); dense areas are thinned, outliers are all kept")
+    else:
+        st.caption(f"Showing {drawn:,} points ({renderer})")
+
+
+# Export of a view's rows as CSV or Parquet. select_rows() returns the row positions
+# in export order and is only called when an export is prepared; the file is written
+# chunk by chunk with a progress bar and read from disk when the download is clicked.
+# The state arguments identify the view, as for cached_view().
+def export_controls(key, fetch_rows, select_rows, file_stem, columns=None, total=None, **state):
+    from music_export import EXPORT_FORMATS, export_max_rows, export_rows, new_export_path, read_export
+
+    max_rows = export_max_rows()
+    with st.expander("Export"):
+        fmt = st.radio("Format:", list(EXPORT_FORMATS), horizontal=True, key=f'{key}_export_format')
+        extension, mime = EXPORT_FORMATS[fmt]
+        if total is not None and total > max_rows:
+            st.caption(f"Exports stop at {max_rows:,} rows; narrow the view to export all {total:,}")
+
+        signature = ResultCache.key(key, current_dataset().version, fmt=fmt, **state)
+        if st.button("Prepare export", key=f'{key}_export_prepare'):
+            bar = st.progress(0.0, text="Exporting...")
+            row_ids = select_rows()[:max_rows]
+            path = new_export_path(extension)
+            rows = export_rows(fetch_rows, row_ids, path, fmt, columns,
+                               progress=lambda done, n: bar.progress(done / max(n, 1),
+                                                                     text=f"Exported {done:,} of {n:,} rows"))
+            st.session_state[f'{key}_export'] = (signature, path, rows)
+
+        prepared = st.session_state.get(f'{key}_export')
+        if prepared and prepared[0] == signature and os.path.exists(prepared[1]):
+            _, path, rows = prepared
+            st.download_button(f"Download {rows:,} rows ({os.path.getsize(path) / 2 ** 20:.1f} MB)",
+                               data=lambda: read_export(path), file_name=f"{file_stem}.{extension}", mime=mime,
+                               key=f'{key}_export_download')
@@ -0,0 +1,192 @@
+import os
+import json
+import hashlib
+import argparse
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (needed by pandas for Parquet)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Bump this whenever the cached schema changes so old caches get rebuilt
+SCHEMA_VERSION = 2
+
+# Column groups used across the music app
+CATEGORY_COLUMNS = ['Genre', 'Artist Cleaned']
+COUNT_COLUMNS = ['Views', 'Likes', 'Comments', 'Stream']
+FEATURE_COLUMNS = ['Danceability', 'Energy', 'Key', 'Loudness', 'Speechiness', 'Acousticness',
+                   'Instrumentalness', 'Liveness', 'Valence', 'Tempo']
+# Columns identifying a track across exports; an upserted row replaces every row with the same URLs
+UPSERT_KEYS = ['Url_spotify', 'Url_youtube']
+
+CSV_ENCODING = 'ISO-8859-1'
+
+# Other text columns are stored as categoricals when at most this share of their values is distinct
+CATEGORY_MAX_RATIO = 0.5
+# Counts are whole numbers: Int32 while they fit, Int64 beyond (views and streams reach billions)
+INT32_MAX = 2 ** 31 - 1
+
+
+# Hash the source file in blocks so large exports don't have to fit in memory
+def file_sha256(path, block_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# Location of the Parquet cache and its metadata for a given CSV.
+# `variant` keeps differently built caches of the same CSV apart.
+def cache_paths(path, cache_dir=None, variant=''):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), '.music_cache')
+    name = os.path.splitext(os.path.basename(path))[0] + variant
+    return (os.path.join(cache_dir, f"{name}.parquet"),
+            os.path.join(cache_dir, f"{name}.meta.json"))
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(meta_path, meta):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+# Convert the raw CSV frame into the compact typed schema stored in the cache:
+# repeated strings become categoricals (one copy of each value plus small integer codes),
+# counts nullable integers and audio features float32
+def apply_schema(df):
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif col in COUNT_COLUMNS:
+            values = pd.to_numeric(df[col], errors='coerce').round()
+            high = values.abs().max()
+            df[col] = values.astype('Int64' if high > INT32_MAX else 'Int32')
+        elif col in FEATURE_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        elif pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            present = df[col].count()
+            if present and df[col].nunique() <= CATEGORY_MAX_RATIO * present:
+                df[col] = df[col].astype('category')
+    return df
+
+
+# Memory held by each column (strings included) with its type and share of the frame
+def memory_report(df):
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'MB': usage / 2 ** 20})
+    report['share'] = report['MB'] / report['MB'].sum()
+    return report
+
+
+# 64-bit hash of each row's values in the given columns, to match rows of large
+# frames by key with np.isin/searchsorted instead of merges (missing values hash as '')
+def key_hashes(df, columns):
+    keys = df[columns].astype(object).fillna('')
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def read_source_csv(path):
+    return apply_schema(pd.read_csv(path, encoding=CSV_ENCODING))
+
+
+# Check whether the cache still matches the source CSV.
+# mtime/size are compared first; the hash is only computed when they differ,
+# so touching the file without changing it does not force a rebuild.
+def cache_is_fresh(path, meta):
+    if not meta or meta.get('schema_version') != SCHEMA_VERSION:
+        return False
+    stat = os.stat(path)
+    if meta.get('source_mtime') == stat.st_mtime and meta.get('source_size') == stat.st_size:
+        return True
+    return meta.get('source_sha256') == file_sha256(path)
+
+
+def build_cache(path, parquet_path, meta_path):
+    df = read_source_csv(path)
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+
+    # Write to a temporary file first so a crash never leaves a half-written cache
+    tmp_path = parquet_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+
+    meta = source_meta(path)
+    write_meta(meta_path, meta)
+    return df, meta
+
+
+# Metadata identifying the current contents of the source CSV
+def source_meta(path):
+    stat = os.stat(path)
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'source_mtime': stat.st_mtime,
+        'source_size': stat.st_size,
+        'source_sha256': file_sha256(path),
+    }
+
+
+# Record a new mtime for an unchanged source so the next check skips hashing again
+def refresh_meta_mtime(path, meta, meta_path):
+    stat = os.stat(path)
+    if meta['source_mtime'] != stat.st_mtime:
+        meta['source_mtime'] = stat.st_mtime
+        write_meta(meta_path, meta)
+
+
+# Load the dataset, converting the CSV into a Parquet cache on first use.
+# Returns the frame and a short dataset version derived from the source hash.
+def load_dataset(path, cache_dir=None):
+    if not HAS_PYARROW:
+        # No columnar backend available: fall back to parsing the CSV
+        return read_source_csv(path), file_sha256(path)[:12]
+
+    parquet_path, meta_path = cache_paths(path, cache_dir)
+    meta = read_meta(meta_path)
+
+    if os.path.exists(parquet_path) and cache_is_fresh(path, meta):
+        refresh_meta_mtime(path, meta, meta_path)
+        df = pd.read_parquet(parquet_path)
+    else:
+        df, meta = build_cache(path, parquet_path, meta_path)
+
+    return df, meta['source_sha256'][:12]
+
+
+# Cheap key that changes whenever the source file is replaced or edited
+def source_signature(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime, stat.st_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-column memory of the music dataset, as parsed and as loaded")
+    parser.add_argument('source', help="the dataset CSV")
+    args = parser.parse_args()
+
+    raw = pd.read_csv(args.source, encoding=CSV_ENCODING)
+    before = memory_report(raw)
+    after = memory_report(apply_schema(raw.copy()))
+    report = before[['dtype', 'MB']].join(after[['dtype', 'MB']], lsuffix=' (csv)', rsuffix=' (loaded)')
+    pd.set_option('display.width', 200)
+    print(report.round(2).to_string())
+    total_before, total_after = before['MB'].sum(), after['MB'].sum()
+    print(f"\nTotal: {total_before:,.1f} MB -> {total_after:,.1f} MB ({total_before / total_after:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
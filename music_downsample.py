@@ -0,0 +1,72 @@
+import numpy as np
+
+# Scatter charts with more points than this are drawn with WebGL (Scattergl) instead of SVG
+WEBGL_THRESHOLD = 2_000
+# Above this many points the data is downsampled on the server before it is sent
+DOWNSAMPLE_THRESHOLD = 20_000
+# Points kept when downsampling (outliers come on top of this)
+DOWNSAMPLE_TARGET = 10_000
+# Grid cells per axis used to measure density
+DOWNSAMPLE_BINS = 64
+# Share of the target spent on outliers: the extreme ends of x and y, always kept
+OUTLIER_SHARE = 0.05
+# Column added to downsampled frames: how many original points each drawn point stands for
+REPRESENTED_COLUMN = 'Represented'
+
+
+# Plotly Express render mode for a scatter of n points
+def render_mode(n_points):
+    return 'webgl' if n_points > WEBGL_THRESHOLD else 'svg'
+
+
+# Thin a scatter to about `target` points while keeping its shape.
+# Points are binned on a grid over x/y; every occupied cell keeps at least one point and
+# dense cells are thinned in proportion to their count, so clusters stay clusters and
+# sparse regions stay fully visible. Points in the outer quantiles of x or y, and the
+# largest values of `size`, are outliers and always kept.
+# Returns the kept rows with a REPRESENTED_COLUMN weight, and the number of points represented.
+def downsample_points(df, x, y, size=None, target=DOWNSAMPLE_TARGET, threshold=DOWNSAMPLE_THRESHOLD,
+                      bins=DOWNSAMPLE_BINS, seed=0):
+    df = df.dropna(subset=[x, y])
+    total = len(df)
+    if total <= threshold:
+        return df.assign(**{REPRESENTED_COLUMN: 1.0}), total
+
+    xs = df[x].to_numpy(dtype=np.float64)
+    ys = df[y].to_numpy(dtype=np.float64)
+    tail = OUTLIER_SHARE * target / 4 / total
+    x_low, x_high = np.quantile(xs, [tail, 1 - tail])
+    y_low, y_high = np.quantile(ys, [tail, 1 - tail])
+    outlier = (xs < x_low) | (xs > x_high) | (ys < y_low) | (ys > y_high)
+    if size is not None:
+        sizes = df[size].to_numpy(dtype=np.float64, na_value=np.nan)
+        largest = np.argsort(np.nan_to_num(sizes, nan=-np.inf))[-max(int(OUTLIER_SHARE * target / 4), 1):]
+        outlier[largest] = True
+
+    # Grid cell of every remaining point
+    rest = np.flatnonzero(~outlier)
+    cx = np.clip(((xs[rest] - x_low) / max(x_high - x_low, 1e-12) * bins).astype(np.int64), 0, bins - 1)
+    cy = np.clip(((ys[rest] - y_low) / max(y_high - y_low, 1e-12) * bins).astype(np.int64), 0, bins - 1)
+    cells = cx * bins + cy
+    counts = np.bincount(cells, minlength=bins * bins)
+
+    # Same sampling rate in every cell, but never below one point per occupied cell
+    budget = max(target - int(outlier.sum()), 0)
+    rate = budget / max(len(rest), 1)
+    sparse = (counts > 0) & (counts * rate < 1)
+    rate = max(budget - int(sparse.sum()), 0) / max(int(counts[~sparse].sum()), 1)
+    quota = np.where(counts > 0, np.maximum(np.round(counts * rate), 1), 0).astype(np.int64)
+
+    # Random order inside each cell, then keep the first `quota` points of each
+    order = np.lexsort((np.random.default_rng(seed).random(len(rest)), cells))
+    sorted_cells = cells[order]
+    starts = np.searchsorted(sorted_cells, np.arange(bins * bins))
+    rank = np.arange(len(order)) - starts[sorted_cells]
+    kept = order[rank < quota[sorted_cells]]
+
+    weights = np.ones(total)
+    weights[rest[kept]] = counts[cells[kept]] / quota[cells[kept]]
+    keep = np.zeros(total, dtype=bool)
+    keep[rest[kept]] = True
+    keep |= outlier
+    return df[keep].assign(**{REPRESENTED_COLUMN: weights[keep]}), total
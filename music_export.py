@@ -0,0 +1,92 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Rows read from the dataset and written out per step of an export
+EXPORT_CHUNK_ROWS = 50_000
+# Largest export offered by default (MUSIC_EXPORT_MAX_ROWS overrides it)
+EXPORT_MAX_ROWS = 1_000_000
+# Finished exports older than this are removed when a new one is started
+EXPORT_MAX_AGE = 24 * 3600
+
+# Offered formats: file extension and MIME type
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+# Exports are written here and served from disk, so a finished export is never held
+# in memory between reruns
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'music_exports')
+
+
+def export_max_rows():
+    return int(os.environ.get('MUSIC_EXPORT_MAX_ROWS', EXPORT_MAX_ROWS))
+
+
+# The same column types for every chunk: category codes vary from chunk to chunk and
+# Int32/Int64 is picked per chunk by apply_schema, so those are widened to plain
+# strings and Int64 and every Parquet row group shares one schema
+def export_frame(df):
+    types = {}
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            types[column] = object
+        elif pd.api.types.is_integer_dtype(dtype):
+            types[column] = 'Int64'
+    return df.astype(types)
+
+
+# Path for a new export file; exports left over from earlier sessions are removed
+def new_export_path(extension, export_dir=EXPORT_DIR):
+    os.makedirs(export_dir, exist_ok=True)
+    cutoff = time.time() - EXPORT_MAX_AGE
+    for name in os.listdir(export_dir):
+        old = os.path.join(export_dir, name)
+        try:
+            if os.path.getmtime(old) < cutoff:
+                os.remove(old)
+        except OSError:
+            pass
+    handle, path = tempfile.mkstemp(suffix=f'.{extension}', dir=export_dir)
+    os.close(handle)
+    return path
+
+
+# Write the rows at row_ids (in that order) to path as CSV or Parquet, fetching and
+# writing EXPORT_CHUNK_ROWS rows at a time, so memory stays at one chunk however many
+# rows are exported. progress(done, total) is called after every chunk.
+def export_rows(fetch_rows, row_ids, path, fmt='CSV', columns=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    row_ids = np.asarray(row_ids)
+    total = len(row_ids)
+    writer = None
+    schema = None
+    done = 0
+    with open(path, 'w', encoding='utf-8', newline='') if fmt == 'CSV' else open(path, 'wb') as out:
+        try:
+            for start in range(0, max(total, 1), chunk_rows):
+                chunk = export_frame(fetch_rows(row_ids[start:start + chunk_rows], columns))
+                if fmt == 'CSV':
+                    chunk.to_csv(out, header=(start == 0), index=False)
+                else:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    if writer is None:
+                        schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                        writer = pq.ParquetWriter(out, schema)
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+        finally:
+            if writer is not None:
+                writer.close()
+    return done
+
+
+# Contents of a finished export, read when the download is clicked
+def read_export(path):
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+from music_data import COUNT_COLUMNS
+
+
+# Reorder the rows so each artist's tracks are stored contiguously
+def group_by_artist(df):
+    return df.sort_values('Artist Cleaned', kind='stable', na_position='last').reset_index(drop=True)
+
+
+# Artist -> row slice index over a frame grouped with group_by_artist().
+# Looking up an artist is a dictionary hit plus a zero-copy iloc slice, so the
+# artist pages cost O(rows for that artist) instead of a full boolean mask.
+class ArtistIndex:
+    def __init__(self, df):
+        names = df['Artist Cleaned'].astype(object)
+        valid = names.notna().to_numpy()
+        names = names[valid].astype(str).to_numpy()
+
+        # Boundaries are the positions where the artist name changes
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]]) if len(names) else np.array([], dtype=int)
+        stops = np.r_[starts[1:], len(names)]
+        if len(set(names[starts])) != len(starts):
+            raise ValueError("Rows are not grouped by artist; pass the frame through group_by_artist() first")
+
+        self.df = df
+        self.slices = {names[start]: slice(int(start), int(stop)) for start, stop in zip(starts, stops)}
+        self.artists = sorted(self.slices)
+        self._items = {}
+
+    # The frame is not pickled with the index; music_shared re-attaches it after loading
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['df'] = None
+        state['_items'] = {}
+        return state
+
+    def __contains__(self, artist):
+        return artist in self.slices
+
+    def row_ids(self, artist):
+        span = self.slices.get(artist, slice(0, 0))
+        return np.arange(span.start, span.stop)
+
+    def rows(self, artist):
+        return self.df.iloc[self.slices.get(artist, slice(0, 0))]
+
+    def rows_for(self, artists):
+        return pd.concat([self.rows(artist) for artist in artists])
+
+    # Unique Track or Album names of an artist in file order, computed once per artist
+    def items(self, artist, level):
+        key = (artist, level)
+        if key not in self._items:
+            self._items[key] = self.rows(artist)[level].dropna().unique().tolist()
+        return self._items[key]
+
+    def tracks(self, artist):
+        return self.items(artist, 'Track')
+
+    def albums(self, artist):
+        return self.items(artist, 'Album')
+
+
+# Per-feature sorted row orders for range filtering.
+# A range query is two searchsorted calls on the sorted values and returns the
+# matching row positions already ordered by the feature.
+class FeatureIndex:
+    def __init__(self, df, features):
+        self.build({feature: df[feature].to_numpy(dtype=np.float64, na_value=np.nan) for feature in features})
+
+    # Build from one array of values per feature (row position = array position)
+    @classmethod
+    def from_arrays(cls, arrays):
+        index = cls.__new__(cls)
+        index.build(arrays)
+        return index
+
+    def build(self, arrays):
+        self.order = {}
+        self.values = {}
+        for feature, values in arrays.items():
+            order = np.argsort(values, kind='stable')
+            # NaNs sort to the end; leave them out of the index
+            order = order[:np.count_nonzero(~np.isnan(values))]
+            self.order[feature] = order.astype(np.int32)
+            self.values[feature] = values[order]
+
+    def bounds(self, feature):
+        values = self.values[feature]
+        if len(values) == 0:
+            return 0.0, 0.0
+        return float(values[0]), float(values[-1])
+
+    # Start/stop positions in the sorted order for low <= value <= high
+    def span(self, feature, low, high):
+        values = self.values[feature]
+        return (int(np.searchsorted(values, low, side='left')),
+                int(np.searchsorted(values, high, side='right')))
+
+    def count(self, feature, low, high):
+        start, stop = self.span(feature, low, high)
+        return stop - start
+
+    def sorted_values(self, feature):
+        return self.values[feature]
+
+    # Values at the given quantiles (0-1), interpolated between neighbouring sorted values
+    def quantiles(self, feature, quantiles):
+        values = self.sorted_values(feature)
+        if len(values) == 0:
+            return np.full(len(quantiles), np.nan)
+        positions = np.asarray(quantiles, dtype=np.float64) * (len(values) - 1)
+        low = np.floor(positions).astype(np.int64)
+        high = np.ceil(positions).astype(np.int64)
+        return values[low] + (values[high] - values[low]) * (positions - low)
+
+    # Bin edges and counts of `bins` equal-width bins over the feature's range,
+    # found with binary searches on the sorted values
+    def histogram(self, feature, bins):
+        values = self.sorted_values(feature)
+        low, high = self.bounds(feature)
+        edges = np.linspace(low, high, bins + 1)
+        positions = np.searchsorted(values, edges, side='left')
+        # The last bin includes its upper edge
+        positions[-1] = len(values)
+        return edges, np.diff(positions)
+
+    # Every matching row position, sorted ascending or descending by the feature (a
+    # view of the sorted order, nothing is copied)
+    def range_rows(self, feature, low, high, descending=False):
+        start, stop = self.span(feature, low, high)
+        rows = self.order[feature][start:stop]
+        return rows[::-1] if descending else rows
+
+    # One page of matching row positions, sorted ascending or descending by the feature
+    def page(self, feature, low, high, page=0, page_size=100, descending=False):
+        start, stop = self.span(feature, low, high)
+        if descending:
+            first = max(stop - (page + 1) * page_size, start)
+            rows = self.order[feature][first:stop - page * page_size][::-1]
+        else:
+            first = start + page * page_size
+            rows = self.order[feature][first:min(first + page_size, stop)]
+        return rows, stop - start
+
+
+# Every artist's Tracks and Albums ranked by each counter, built once from
+# music_aggregates.item_sums(). One lexsort per (level, metric) over every item, by
+# artist and then by the metric, largest first (no per-artist heaps), so an artist's top
+# n are the first n positions of its slice and its bottom n the last n: the artist pages
+# only look up.
+class TopItemsIndex:
+    LEVELS = ('Track', 'Album')
+
+    def __init__(self, sums, metrics=COUNT_COLUMNS):
+        self.tables = {}
+        self.artists = {}
+        self.bounds = {}
+        self.order = {}
+        for level in self.LEVELS:
+            part = sums[sums['Artist Cleaned'].notna() & sums[level].notna()]
+            artist_codes, artists = pd.factorize(part['Artist Cleaned'].astype(str), sort=True)
+            item_codes, items = pd.factorize(part[level])
+
+            # One group per (artist, item), ordered by artist
+            groups, inverse = np.unique(artist_codes.astype(np.int64) * len(items) + item_codes, return_inverse=True)
+            codes = groups // max(len(items), 1)
+            table = pd.DataFrame({level: items.to_numpy()[groups % max(len(items), 1)]})
+            for metric in metrics:
+                values = np.nan_to_num(part[metric].to_numpy(dtype=np.float64, na_value=np.nan))
+                table[metric] = np.bincount(inverse, weights=values, minlength=len(groups))
+                self.order[(level, metric)] = np.lexsort((-table[metric].to_numpy(), codes)).astype(np.int32)
+
+            self.tables[level] = table
+            self.artists[level] = artists.to_numpy(dtype=object)
+            self.bounds[level] = np.searchsorted(codes, np.arange(len(artists) + 1)).astype(np.int64)
+
+    # Start/stop of the artist's items in the ranked orders of a level
+    def span(self, artist, level):
+        artists = self.artists[level]
+        i = int(np.searchsorted(artists, artist))
+        if i == len(artists) or artists[i] != artist:
+            return 0, 0
+        return int(self.bounds[level][i]), int(self.bounds[level][i + 1])
+
+    def rows(self, level, metric, positions):
+        return self.tables[level].iloc[positions][[level, metric]].reset_index(drop=True)
+
+    # All Tracks or Albums of the artist with the summed metric, largest first
+    def ranked(self, artist, level, metric):
+        start, stop = self.span(artist, level)
+        return self.rows(level, metric, self.order[(level, metric)][start:stop])
+
+    # The n Tracks or Albums with the most of the metric, largest first
+    def top(self, artist, level, metric, n):
+        start, stop = self.span(artist, level)
+        return self.rows(level, metric, self.order[(level, metric)][start:min(start + n, stop)])
+
+    # The n Tracks or Albums with the least of the metric, smallest first
+    def bottom(self, artist, level, metric, n):
+        start, stop = self.span(artist, level)
+        return self.rows(level, metric, self.order[(level, metric)][max(stop - n, start):stop][::-1])
@@ -0,0 +1,277 @@
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from music_data import (CSV_ENCODING, COUNT_COLUMNS, FEATURE_COLUMNS, UPSERT_KEYS, apply_schema, cache_paths, read_meta,
+                        write_meta, cache_is_fresh, source_meta, refresh_meta_mtime, key_hashes)
+from music_aggregates import (track_sums, item_sums, track_key_hashes, merge_track_sums, merge_item_sums,
+                              build_genre_cube, build_genre_artist_cube, build_track_cube)
+from music_index import FeatureIndex, TopItemsIndex
+from music_search import SEARCH_FIELDS, FieldIndexBuilder, MusicSearchIndex, row_popularity
+from music_similar import FeatureNeighbors
+from music_insights import FeatureStats
+
+# Rows parsed from the CSV at a time
+CHUNK_SIZE = 200_000
+# Rows per Parquet row group; a detail lookup reads whole row groups, so keep them small
+ROW_GROUP_SIZE = 50_000
+# Row groups read at once by RowStore.take()
+TAKE_BATCH_GROUPS = 4
+# Partial track and item sums are merged every this many chunks to bound their memory
+MERGE_EVERY = 8
+# Bump whenever IngestedDataset gains or changes attributes so older summaries are rebuilt
+INGEST_FORMAT = 7
+
+
+# Column type decided from the first chunk: 'float' for the count and feature columns and
+# for other columns that are numeric with at least one value there, 'string' otherwise.
+# An all-missing column says nothing about its type, so it is kept as text. Later chunks
+# are coerced to the same types so every row group shares one schema.
+def column_types(chunk):
+    types = {}
+    for col in chunk.columns:
+        values = chunk[col]
+        numeric = (pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+                   and values.notna().any())
+        types[col] = 'float' if col in COUNT_COLUMNS or col in FEATURE_COLUMNS or numeric else 'string'
+    return types
+
+
+def storage_table(chunk, types, schema=None):
+    columns = {}
+    for col, kind in types.items():
+        values = chunk[col]
+        if kind == 'float':
+            numbers = pd.to_numeric(values, errors='coerce')
+            # Count and feature columns drop unparsable values, as apply_schema() does;
+            # text in any other numeric column would be lost, so it is an error
+            lost = numbers.isna() & values.notna()
+            if lost.any() and col not in COUNT_COLUMNS and col not in FEATURE_COLUMNS:
+                raise ValueError(f"Column {col!r} was numeric in the first chunk but holds {values[lost].iloc[0]!r}; "
+                                 f"ingest with a larger chunk size")
+            columns[col] = numbers.astype('float64')
+        else:
+            columns[col] = values.astype(object).where(values.isna(), values.astype(str))
+    frame = pd.DataFrame(columns)
+    if schema is None:
+        schema = pa.schema([(col, pa.float64() if kind == 'float' else pa.string()) for col, kind in types.items()])
+    return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+
+# Random access to rows of the Parquet store by row position.
+# Only the row groups holding the requested rows are read.
+class RowStore:
+    def __init__(self, path):
+        self.path = path
+        metadata = pq.ParquetFile(path).metadata
+        sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        self.starts = np.r_[0, np.cumsum(sizes)].astype(np.int64)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_file'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    # Rows at the given positions, in the order requested. Row groups are read a few at
+    # a time and only the requested rows of each batch are kept, so scattered positions
+    # (e.g. rows sorted by a feature) don't pull whole columns into memory.
+    def take(self, row_ids, columns=None):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        with self._lock:
+            if self._file is None:
+                self._file = pq.ParquetFile(self.path)
+            if len(row_ids) == 0:
+                table = self._file.schema_arrow.empty_table()
+                if columns is not None:
+                    table = table.select(columns)
+                return apply_schema(table.to_pandas())
+
+            groups = np.searchsorted(self.starts, row_ids, side='right') - 1
+            needed = np.unique(groups)
+            tables = []
+            positions = []
+            for first in range(0, len(needed), TAKE_BATCH_GROUPS):
+                batch = needed[first:first + TAKE_BATCH_GROUPS]
+                table = self._file.read_row_groups(batch.tolist(), columns=columns)
+
+                # Position of each requested row inside the concatenated row groups
+                wanted = np.flatnonzero(np.isin(groups, batch))
+                sizes = self.starts[batch + 1] - self.starts[batch]
+                bases = np.cumsum(sizes) - sizes
+                local = row_ids[wanted] - self.starts[groups[wanted]] + bases[np.searchsorted(batch, groups[wanted])]
+                tables.append(table.take(pa.array(local)))
+                positions.append(wanted)
+
+        # Back from batch order to the requested order
+        table = pa.concat_tables(tables).take(pa.array(np.argsort(np.concatenate(positions), kind='stable')))
+        return apply_schema(table.to_pandas())
+
+
+# Same interface as music_index.ArtistIndex, but an artist's rows are fetched
+# from the row store on demand instead of sliced from an in-memory frame
+class DiskArtistIndex:
+    def __init__(self, field_index, store):
+        self.field_index = field_index
+        self.store = store
+        self.artists = [artist for artist in field_index.terms if artist]
+        self._items = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_items'] = {}
+        return state
+
+    def __contains__(self, artist):
+        return len(self.field_index.rows_for_value(artist)) > 0
+
+    def row_ids(self, artist):
+        return np.sort(self.field_index.rows_for_value(artist))
+
+    def rows(self, artist):
+        return self.store.take(self.row_ids(artist))
+
+    def rows_for(self, artists):
+        return self.store.take(np.concatenate([self.row_ids(artist) for artist in artists]))
+
+    def items(self, artist, level):
+        key = (artist, level)
+        if key not in self._items:
+            rows = self.store.take(self.row_ids(artist), columns=[level])
+            self._items[key] = rows[level].dropna().unique().tolist()
+        return self._items[key]
+
+    def tracks(self, artist):
+        return self.items(artist, 'Track')
+
+    def albums(self, artist):
+        return self.items(artist, 'Album')
+
+
+# Everything the app needs from a dataset that was ingested in chunks:
+# aggregates and indexes stay in memory, raw rows live in the Parquet row store.
+class IngestedDataset:
+    def __init__(self, version, store, sums, items, row_keys, search_index, artist_index, feature_index, feature_stats,
+                 similar_index):
+        self.version = version
+        self.store = store
+        self.sums = sums
+        self.row_keys = row_keys
+        self.sums_keys = track_key_hashes(sums)
+        self.genre_cube = build_genre_cube(sums)
+        self.artist_cube = build_genre_artist_cube(sums)
+        self.track_cube = build_track_cube(sums)
+        self.search_index = search_index
+        self.artist_index = artist_index
+        self.top_items = TopItemsIndex(items)
+        self.feature_index = feature_index
+        self.feature_stats = feature_stats
+        self.similar_index = similar_index
+
+    def __len__(self):
+        return len(self.store)
+
+    def take(self, row_ids, columns=None):
+        return self.store.take(row_ids, columns)
+
+    def view_version(self, genres=None, artists=None):
+        return self.version
+
+
+# Stream the CSV into a Parquet row store, building the aggregates and indexes
+# chunk by chunk. Peak memory is one chunk plus the summaries.
+def ingest_csv(path, store_path, version, chunksize=CHUNK_SIZE):
+    types = schema = writer = None
+    partial_sums = []
+    partial_items = []
+    feature_stats = None
+    search_builders = {field: FieldIndexBuilder() for field in SEARCH_FIELDS}
+    artist_builder = FieldIndexBuilder(lower=False, with_postings=False)
+    features = {feature: [] for feature in FEATURE_COLUMNS}
+    popularity = []
+    row_keys = []
+
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    tmp_path = store_path + '.tmp'
+    try:
+        for chunk in pd.read_csv(path, encoding=CSV_ENCODING, chunksize=chunksize):
+            # Raw rows go to the columnar store
+            if writer is None:
+                types = column_types(chunk)
+                table = storage_table(chunk, types)
+                schema = table.schema
+                writer = pq.ParquetWriter(tmp_path, schema)
+            else:
+                table = storage_table(chunk, types, schema)
+            writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+            # Summaries are updated from the typed chunk
+            chunk = apply_schema(chunk)
+            partial_sums.append(track_sums(chunk))
+            partial_items.append(item_sums(chunk))
+            chunk_stats = FeatureStats.from_frame(chunk)
+            feature_stats = chunk_stats if feature_stats is None else feature_stats.combine(chunk_stats)
+            if len(partial_sums) >= MERGE_EVERY:
+                partial_sums = [merge_track_sums(partial_sums)]
+                partial_items = [merge_item_sums(partial_items)]
+            for field, builder in search_builders.items():
+                builder.add(chunk[field])
+            artist_builder.add(chunk['Artist Cleaned'])
+            popularity.append(row_popularity(chunk))
+            row_keys.append(key_hashes(chunk, UPSERT_KEYS))
+            for feature in FEATURE_COLUMNS:
+                features[feature].append(chunk[feature].to_numpy(dtype=np.float64, na_value=np.nan))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"{path} contains no rows")
+    os.replace(tmp_path, store_path)
+
+    store = RowStore(store_path)
+    search_index = MusicSearchIndex(indexes={field: builder.build() for field, builder in search_builders.items()},
+                                    popularity=np.concatenate(popularity))
+    artist_index = DiskArtistIndex(artist_builder.build(), store)
+    features = {feature: np.concatenate(arrays) for feature, arrays in features.items()}
+    feature_index = FeatureIndex.from_arrays(features)
+    similar_index = FeatureNeighbors(features)
+    return IngestedDataset(version, store, merge_track_sums(partial_sums), merge_item_sums(partial_items),
+                           np.concatenate(row_keys), search_index, artist_index, feature_index, feature_stats,
+                           similar_index)
+
+
+# Out-of-core counterpart of music_data.load_dataset(): ingests the CSV once and
+# reloads the pickled summaries while the source file is unchanged
+def load_ingested(path, cache_dir=None, chunksize=CHUNK_SIZE):
+    store_path, meta_path = cache_paths(path, cache_dir, variant='.rows')
+    summary_path = os.path.splitext(store_path)[0] + f".summary-v{INGEST_FORMAT}.pkl"
+    meta = read_meta(meta_path)
+
+    if os.path.exists(store_path) and os.path.exists(summary_path) and cache_is_fresh(path, meta):
+        refresh_meta_mtime(path, meta, meta_path)
+        with open(summary_path, 'rb') as f:
+            return pickle.load(f)
+
+    meta = source_meta(path)
+    dataset = ingest_csv(path, store_path, meta['source_sha256'][:12], chunksize)
+    tmp_path = summary_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(dataset, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, summary_path)
+    write_meta(meta_path, meta)
+    return dataset
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from music_data import FEATURE_COLUMNS
+from music_aggregates import COUNT_SUFFIX
+
+# Bins of the feature histograms
+HISTOGRAM_BINS = 40
+# Quantiles listed in the Feature Insights summary
+SUMMARY_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+# Positions a range slider snaps to when snapping to quantiles (every 5%)
+SNAP_QUANTILES = tuple(np.round(np.linspace(0, 1, 21), 2))
+
+
+# Sums behind the audio feature summaries:
+#   moments      per feature pair, over the rows where both are present: row count,
+#                sum and sum of squares of each feature, and sum of their products
+#   genre_sums   per genre, the sum and non-null count of every feature
+# Both add up over chunks of rows and can be patched by subtracting removed rows, so
+# they are built once per dataset and maintained with it instead of rescanning rows.
+class FeatureStats:
+    def __init__(self, moments, genre_sums, features=FEATURE_COLUMNS):
+        self.moments = moments
+        self.genre_sums = genre_sums
+        self.features = list(features)
+
+    @classmethod
+    def from_frame(cls, df, features=FEATURE_COLUMNS):
+        matrix = np.column_stack([df[f].to_numpy(dtype=np.float64, na_value=np.nan) for f in features])
+        valid = ~np.isnan(matrix)
+        present = valid.astype(np.float64)
+        values = np.where(valid, matrix, 0.0)
+        moments = {
+            'n': present.T @ present,
+            'sum': values.T @ present,
+            'sum_sq': (values * values).T @ present,
+            'cross': values.T @ values,
+        }
+
+        grouped = df[['Genre'] + list(features)].astype({f: 'float64' for f in features}).groupby(
+            'Genre', observed=True)
+        genre_sums = grouped.sum().join(grouped.count().add_suffix(COUNT_SUFFIX))
+        # Plain strings so tables from different chunks line up
+        genre_sums.index = genre_sums.index.astype(object)
+        return cls(moments, genre_sums, features)
+
+    # These sums plus (or, with sign=-1, minus) another set
+    def combine(self, other, sign=1):
+        moments = {name: value + sign * other.moments[name] for name, value in self.moments.items()}
+        genre_sums = pd.concat([self.genre_sums, sign * other.genre_sums]).groupby(level=0).sum()
+        return FeatureStats(moments, genre_sums, self.features)
+
+    # Pearson correlation of every feature pair over the rows where both are present
+    # (the same as DataFrame.corr())
+    def correlation(self):
+        n, sums, sum_sq, cross = (self.moments[name] for name in ('n', 'sum', 'sum_sq', 'cross'))
+        covariance = n * cross - sums * sums.T
+        variance = (n * sum_sq - sums ** 2) * (n * sum_sq.T - sums.T ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = covariance / np.sqrt(variance)
+        corr[(n < 2) | ~(variance > 0)] = np.nan
+        return pd.DataFrame(corr.clip(-1, 1), index=self.features, columns=self.features)
+
+    # Mean of every feature per genre (missing values left out)
+    def genre_means(self):
+        counts = self.genre_sums[[f + COUNT_SUFFIX for f in self.features]].to_numpy()
+        sums = self.genre_sums[self.features].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        means = pd.DataFrame(means, index=self.genre_sums.index, columns=self.features)
+        means.index.name = 'Genre'
+        return means[counts.sum(axis=1) > 0]
+
+
+# Feature pairs ordered by the strength of their correlation
+def strongest_pairs(corr, n=5):
+    upper = np.triu(np.ones(corr.shape, dtype=bool), k=1)
+    pairs = corr.where(upper).stack().rename('Correlation').reset_index()
+    pairs.columns = ['Feature', 'Other feature', 'Correlation']
+    return pairs.reindex(pairs['Correlation'].abs().sort_values(ascending=False).index).head(n).reset_index(drop=True)
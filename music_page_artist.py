@@ -0,0 +1,109 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+
+def combined_line_plot(artist_index, top_items):
+    # Streamlit application setup
+    st.title("Artist Comparison")
+
+    # Dropdown for choosing y-axis
+    y_axis = st.selectbox("Select variable:", ['Likes', 'Comments', 'Views', 'Stream'], index=0)
+
+    # Radio for choosing x-axis (Track or Album)
+    x_axis = st.radio("Compare by:", ['Track', 'Album'], index=0, horizontal=True)
+
+    # Dropdowns for selecting artists
+    artist1 = st.selectbox("Select Artist 1:", artist_index.artists)
+    artist2_options = [artist for artist in artist_index.artists if artist != artist1]
+    artist2 = st.selectbox("Select Artist 2:", artist2_options)
+
+    artist3_options = [artist for artist in artist2_options if artist != artist2]
+    artist3 = st.selectbox("Select Artist 3 (optional):", ['None'] + artist3_options)
+    if artist3 == 'None':
+        artist3 = None
+
+    selected_artists = [artist1, artist2]
+    if artist3:
+        selected_artists.append(artist3)
+    
+    # Handle track or album selection
+    top_x = 10 if x_axis == 'Track' else 5
+
+    # Top X tracks/albums of each selected artist, looked up in the precomputed rankings and indexed from 1
+    artist_tops = {artist: top_items.top(artist, x_axis, y_axis, top_x) for artist in selected_artists}
+    df_filtered = pd.concat([items.assign(**{'Artist Cleaned': artist, 'Index': (items.index + 1).astype(str)})
+                             for artist, items in artist_tops.items()], ignore_index=True)
+    
+    # Determine hover data based on x-axis choice
+    hover_data = [x_axis] if x_axis == 'Track' else ['Album']
+    
+    # Create a combined line plot
+    fig = px.line(df_filtered, x='Index', y=y_axis, color='Artist Cleaned', markers=True, line_shape='linear',
+                  hover_data=hover_data)
+    
+    # Update layout
+    fig.update_layout(
+        xaxis_title=f'Top {top_x} {x_axis}s (Ranked)',
+        yaxis_title=y_axis,
+        xaxis=dict(tickvals=[str(i) for i in range(1, top_x + 1)]),  # Ensure x-axis has values 1 to 10
+    )
+    
+    st.plotly_chart(fig)
+    
+    # Prepare the table for most liked/streamed tracks/albums
+    st.subheader(f"{x_axis}s With The Most {y_axis}")
+    table_data = {}
+    for artist in selected_artists:
+        artist_top_item = artist_tops[artist]
+        if not artist_top_item.empty:
+            artist_top_item[y_axis] = artist_top_item[y_axis].astype(int)  # Remove decimal points
+            table_data[artist] = artist_top_item
+
+    # Combine tables
+    if table_data:
+        combined_table = pd.concat(table_data.values(), axis=1)
+        combined_table.columns = pd.MultiIndex.from_tuples(
+            [(artist, x_axis) if i % 2 == 0 else (artist, y_axis) for artist in selected_artists for i in range(2)]
+        )
+        combined_table.index = range(1, len(combined_table) + 1)  # Reset index starting from 1
+
+        # Display the table with fixed column width
+        st.markdown(
+            combined_table.to_html(classes='table table-striped', index=False),
+            unsafe_allow_html=True
+        )
+        st.markdown(
+            """
+            <style>
+            .table {
+                width: 100%;
+                border-collapse: collapse;
+                color: #FFFFFF; /* Text color */
+            }
+            .table td, .table th {
+                border: 1px solid #555555; /* Cell border color */
+                padding: 8px;
+                width: 300px;
+            }
+            .table th {
+                background-color: #444444; /* Header background color */
+                color: #FFFFFF; /* Header text color */
+            }
+            .table tr:nth-child(even) {
+                background-color: #333333; /* Alternating row color */
+            }
+            .table tr:nth-child(odd) {
+                background-color: #2E2E2E; /* Row color */
+            }
+            </style>
+            """,
+            unsafe_allow_html=True
+        )
+    else:
+        st.warning("No data available for the table.")
+
+
+def render(dataset):
+    # Create the combined line plot
+    combined_line_plot(dataset.artist_index, dataset.top_items)
@@ -0,0 +1,64 @@
+import pandas as pd
+import streamlit as st
+import plotly.express as px
+from music_app import cached_view
+from music_insights import HISTOGRAM_BINS, SUMMARY_QUANTILES, strongest_pairs
+
+
+# Correlation heatmap of the audio features and their strongest pairs
+def correlation_overview(feature_stats):
+    corr = cached_view('feature_correlation', feature_stats.correlation)
+
+    fig = px.imshow(corr, text_auto='.2f', color_continuous_scale='RdBu_r', zmin=-1, zmax=1, aspect='auto',
+                    title="Correlation Between Audio Features")
+    fig.update_layout(height=600)
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Strongest Relationships")
+    pairs = strongest_pairs(corr, 5)
+    pairs.index = pairs.index + 1  # Start index from 1
+    st.table(pairs.style.format({'Correlation': '{:+.2f}'}))
+
+
+# Histogram and quantiles of one feature, read off its sorted index
+def feature_distribution(feature_index, feature):
+    edges, counts = cached_view('feature_histogram', lambda: feature_index.histogram(feature, HISTOGRAM_BINS),
+                                feature=feature)
+    quantiles = cached_view('feature_summary_quantiles',
+                            lambda: feature_index.quantiles(feature, SUMMARY_QUANTILES), feature=feature)
+
+    fig = px.bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, labels={'x': feature, 'y': 'Songs'},
+                 title=f"Distribution of {feature}")
+    fig.update_layout(bargap=0)
+    st.plotly_chart(fig, use_container_width=True)
+
+    table = pd.DataFrame([quantiles], columns=[f"p{q * 100:g}" for q in SUMMARY_QUANTILES], index=[feature])
+    st.table(table.style.format('{:.3g}'))
+
+
+# Mean of one feature per genre, highest first, with all the genre means below
+def genre_means(feature_stats, feature):
+    means = cached_view('feature_genre_means', feature_stats.genre_means)
+    ranked = means[feature].dropna().sort_values(ascending=False).reset_index()
+
+    fig = px.bar(ranked, x='Genre', y=feature, color=feature, color_continuous_scale='Viridis',
+                 title=f"Average {feature} by Genre")
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("All features by genre"):
+        st.dataframe(means.round(3), use_container_width=True)
+
+
+def render(dataset):
+    st.title("Feature Insights")
+
+    # Summaries are computed once per dataset version; no rows are read here
+    tab1, tab2, tab3 = st.tabs(["Correlations", "Distributions", "By Genre"])
+    with tab1:
+        correlation_overview(dataset.feature_stats)
+    with tab2:
+        feature = st.selectbox("Select a variable:", dataset.feature_stats.features, key='insights_distribution')
+        feature_distribution(dataset.feature_index, feature)
+    with tab3:
+        feature = st.selectbox("Select a variable:", dataset.feature_stats.features, key='insights_genre')
+        genre_means(dataset.feature_stats, feature)
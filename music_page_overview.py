@@ -0,0 +1,214 @@
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+from music_aggregates import top_genres, genre_metrics, sunburst_leaves
+from music_app import cached_view, point_caption
+from music_downsample import render_mode
+
+
+# Sunburst Chart
+def piechart(dataset, current_slider_value, leaf_cap):
+    # Take the top genres by number of tracks from the precomputed cube
+    selected_genres = tuple(top_genres(dataset.genre_cube, current_slider_value))
+    fig = sunburst_figure(dataset.view_version(genres=selected_genres), selected_genres, leaf_cap, dataset)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+# Built figures are memoized per version of the shown genres and leaf cap, so moving
+# the slider back reuses the figure and an update only rebuilds figures of genres it touched
+# (the dataset itself is not hashed: its version is part of the key)
+@st.cache_resource(max_entries=128)
+def sunburst_figure(version, selected_genres, leaf_cap, _dataset):
+    # Keep the top 15 artists per genre and at most leaf_cap tracks per artist
+    filtered_data = sunburst_leaves(_dataset.artist_cube, _dataset.track_cube, list(selected_genres), top_artists=15,
+                                    leaf_cap=leaf_cap)
+
+    # Create the Sunburst chart
+    fig = px.sunburst(
+        filtered_data,
+        path=['Genre', 'Artist Cleaned', 'Track'],  # Add tracks to the path
+        values='Stream',  # Use stream values for track level
+        hover_data={'Stream': True},  # Show total streams on hover
+        color='Genre',  # Color based on total streams for artists
+        title="Sunburst Chart: Tracks per Genre, Artist, and Track"
+    )
+
+    # Update layout to adjust text properties
+    fig.update_layout(
+        width=800,
+        height=600,
+        font=dict(
+            family="Arial",   # Choose the font family
+            size=14,          # Adjust font size
+            color="black"     # Adjust font color
+        ),
+        title_font=dict(
+            family="Arial",
+            size=18,
+            color="white"
+        ),
+        paper_bgcolor="dark blue",  # Background color of the chart
+        margin=dict(l=50, r=50, t=50, b=50)  # Adjust margins for better readability
+    )
+
+    return fig
+
+def dual_axis_area_plot(genre_cube, current_slider_value):
+    # Variables to choose from
+    variables = ['Views', 'Likes', 'Comments', 'Stream']
+    
+    # Dropdowns for selecting variables (disable typing)
+    y1_axis = st.selectbox("Select first variable:", options=variables, format_func=lambda x: x)
+    
+    # Ensure that y2_axis is different from y1_axis
+    y2_axis_options = [var for var in variables if var != y1_axis]
+    y2_axis = st.selectbox("Select second variable:", options=y2_axis_options, format_func=lambda x: x)
+
+    # Average of the selected variables for the top genres by total number of tracks
+    genres = top_genres(genre_cube, current_slider_value)
+    grouped_data = cached_view('dual_axis', lambda: genre_metrics(genre_cube, 'mean', genres, [y1_axis, y2_axis]),
+                               genres=genres, metrics=(y1_axis, y2_axis))
+
+    # Create the figure with dual Y-axes
+    fig = go.Figure()
+
+    # Add the first trace for the left Y-axis as an area plot with rounded peaks
+    fig.add_trace(
+        go.Scatter(
+            x=grouped_data['Genre'],
+            y=grouped_data[y1_axis],
+            mode='lines',
+            fill='tozeroy',
+            name=y1_axis,
+            line=dict(color='cyan', shape='spline'),
+            yaxis='y1'
+        )
+    )
+
+    # Add the second trace for the right Y-axis as an area plot with rounded peaks
+    fig.add_trace(
+        go.Scatter(
+            x=grouped_data['Genre'],
+            y=grouped_data[y2_axis],
+            mode='lines',
+            fill='tonexty',
+            name=y2_axis,
+            line=dict(color='magenta', shape='spline'),
+            yaxis='y2'
+        )
+    )
+
+    # Update the layout to include dual Y-axes
+    fig.update_layout(
+        title=f"Dual-Axis Area Plot: Average {y1_axis} and {y2_axis} by Genre",
+        xaxis=dict(title='Genre', titlefont=dict(color='white'), tickfont=dict(color='white')),
+        yaxis=dict(title=f"Average {y1_axis}", titlefont=dict(color='cyan'), tickfont=dict(color='cyan')),
+        yaxis2=dict(title=f"Average {y2_axis}", titlefont=dict(color='magenta'), tickfont=dict(color='magenta'), overlaying='y', side='right'),
+        width=800,
+        height=600,
+        font=dict(
+            family="Arial",
+            size=12,
+            color="black"
+        ),
+        title_font=dict(
+            family="Arial",
+            size=18,
+            color="white"
+        ),
+        paper_bgcolor="dark blue",
+        margin=dict(l=50, r=50, t=50, b=50)
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Display tables for top 5 genres by selected variables
+    top_5_y1 = grouped_data.nlargest(5, y1_axis)[['Genre', y1_axis]].reset_index(drop=True)
+    top_5_y2 = grouped_data.nlargest(5, y2_axis)[['Genre', y2_axis]].reset_index(drop=True)
+    top_5_y1.index = top_5_y1.index + 1  # Adjust index to start from 1
+    top_5_y2.index = top_5_y2.index + 1  # Adjust index to start from 1
+
+    # Display tables side by side
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader(f"Top 5 Genres by Average {y1_axis}")
+        st.table(top_5_y1)
+
+    with col2:
+        st.subheader(f"Top 5 Genres by Average {y2_axis}")
+        st.table(top_5_y2)
+
+
+# Scatter plot function
+def scatter_plot(genre_cube, selected_genres, aggregation_method):
+    st.title("Scatter Plot: Likes vs Comments")
+
+    # Selecting relevant columns
+    numeric_cols = ['Likes', 'Comments', 'Views']
+
+    # Slice the selected genres out of the cube with the chosen aggregation
+    how = 'mean' if aggregation_method == "Mean" else 'sum'
+    grouped_df = cached_view('scatter', lambda: genre_metrics(genre_cube, how, selected_genres, numeric_cols),
+                             genres=selected_genres, how=how)
+
+    # Creating the scatter plot
+    fig = px.scatter(
+        grouped_df,
+        x='Comments',
+        y='Likes',
+        size='Views',
+        color='Genre',
+        hover_name='Genre',
+        title='Bubble Size = Views & Color = Genre',
+        size_max=60,  # Maximum size of bubbles
+        color_discrete_sequence=px.colors.qualitative.Safe,  # Use a nicer color palette
+        render_mode=render_mode(len(grouped_df))
+    )
+
+    fig.update_layout(width=800, height=600)
+
+    # Display the scatter plot
+    st.plotly_chart(fig, use_container_width=True)
+    point_caption(len(grouped_df), len(grouped_df))
+ 
+
+
+def render(dataset):
+    genre_cube = dataset.genre_cube
+
+    st.title("Music Data Overview")
+
+    # Create tabs for Sunburst and Dual-Axis Line Plot
+    tab1, tab2, tab3 = st.tabs(["Sunburst Chart", "Dual-Axis Area Plot", "Scatter Plot"])
+
+    with tab1:
+        genre_slider_sunburst = st.slider("Select number of top genres to display (Sunburst):", min_value=2, max_value=31, value=5)
+        leaf_cap = st.slider("Maximum tracks shown per artist (the rest are grouped as \"Other\"):", min_value=1, max_value=50, value=10)
+        piechart(dataset, genre_slider_sunburst, leaf_cap)
+
+    with tab2:
+        genre_slider_dualaxis = st.slider("Select number of top genres to display (Dual-Axis):", min_value=2, max_value=31, value=5)
+        dual_axis_area_plot(genre_cube, genre_slider_dualaxis)
+
+    with tab3:
+        st.title("Scatter Plot Configuration")
+
+        # Multi-select dropdown for choosing genres
+        selected_genres = st.multiselect(
+            "Select genres to include in the plot:",
+            options=genre_cube['Genre'],
+            default=genre_cube['Genre']  # Default to all genres
+        )
+
+        if not selected_genres:
+            st.warning("Please select at least one genre.")
+        else:
+            # Radio button to select between mean and total
+            aggregation_method = st.radio(
+                "Choose aggregation method:",
+                options=["Total", "Mean"],
+                index=0  # Default to "Total"
+            )
+
+            scatter_plot(genre_cube, selected_genres, aggregation_method)
@@ -0,0 +1,79 @@
+import streamlit as st
+from music_app import cached_view, export_controls
+from music_export import export_max_rows
+
+# Best matches listed by the typo-tolerant Music Search
+RANKED_LIMIT = 50
+
+
+def search_data(fetch_rows, search_index, similar_index, search_term):
+    # Convert search term to lowercase for case-insensitive search
+    search_term = search_term.lower()
+
+    # Rank close matches in Track, Artist, or Album (typos allowed), most popular first among equals
+    def matches():
+        row_ids, _ = search_index.ranked_search(search_term, limit=RANKED_LIMIT)
+        return row_ids, fetch_rows(row_ids)
+
+    row_ids, filtered_data = cached_view('music_search', matches, query=search_term.strip())
+
+    # If there are results, display them
+    if not filtered_data.empty:
+        st.write(f"**Top {len(filtered_data)} matches for:** `{search_term}`")
+
+        # Every close match, best first, not only the ones listed here
+        export_controls('music_search', fetch_rows,
+                        lambda: search_index.ranked_search(search_term, limit=export_max_rows())[0],
+                        "music_search", query=search_term.strip())
+        
+        # Display the results as a selectable list
+        selected_track = st.selectbox("Select a track to see more details:", filtered_data['Track'].unique())
+
+        # Get the details of the selected track
+        track_details = filtered_data[filtered_data['Track'] == selected_track]
+
+        if not track_details.empty:
+            st.write(f"### {selected_track}")
+            st.write(f"**👨🏻‍🎤 Artist:** {track_details['Artist Cleaned'].values[0]}")
+            st.write(f"**📼 Album:** {track_details['Album'].values[0]}")
+            st.write(f"**📀 Genre:** {track_details['Genre'].values[0]}")
+            st.write(f"**📽️ Total Streams:** {int(track_details['Stream'].values[0])}")
+            st.write(f"**▶️ YouTube Views:** {int(track_details['Views'].values[0])}")
+            st.write(f"**👍🏻 YouTube Likes:** {int(track_details['Likes'].values[0])}")
+            st.write(f"**💬 YouTube Comments:** {int(track_details['Comments'].values[0])}")
+            st.write(f"**YouTube URL:** {track_details['Url_youtube'].values[0]}")
+            st.write(f"**Spotify URL:** {track_details['Url_spotify'].values[0]}")
+
+            # Recommend tracks that sound alike
+            st.write("#### Similar Tracks")
+            k = st.slider("Number of similar tracks:", min_value=1, max_value=50, value=10)
+            selected_row = row_ids[list(filtered_data['Track']).index(selected_track)]
+            similar_tracks(fetch_rows, similar_index, selected_row, k)
+    else:
+        st.write(f"No results found for `{search_term}`")
+
+
+# Nearest neighbours of a track in normalized audio feature space
+def similar_tracks(fetch_rows, similar_index, row_id, k):
+    neighbour_ids, distances = similar_index.similar(row_id, k)
+
+    if len(neighbour_ids) == 0:
+        st.info("This track has missing audio features, so no similar tracks can be suggested.")
+        return
+
+    neighbours = fetch_rows(neighbour_ids)[['Track', 'Artist Cleaned', 'Genre']].reset_index(drop=True)
+    neighbours['Distance'] = distances.round(3)
+    neighbours.index = neighbours.index + 1  # Start index from 1
+    st.table(neighbours)
+
+
+def render(dataset):
+    # Streamlit application setup
+    st.title("Music Search")
+
+    # Search bar
+    search_term = st.text_input("Search Track, Artist, or Album:", "")
+
+    # Trigger search when the user enters a term
+    if search_term:
+        search_data(dataset.take, dataset.search_index, dataset.similar_index, search_term)
@@ -0,0 +1,109 @@
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Bars drawn at most: the chart shows the artist's top items, the tables the top and bottom 3
+CHART_ITEMS = 50
+
+
+# Function to create the visualization
+def create_artist_comparison(rankings, artist, comparison_level, variable, selected_items):
+    if selected_items:
+        # Sum of the selected variable per selected Track or Album, largest first
+        comparison_data = rankings.ranked(artist, comparison_level, variable)
+        comparison_data = comparison_data[comparison_data[comparison_level].isin(selected_items)]
+        chart_data = comparison_data.head(CHART_ITEMS)
+        least_items = comparison_data.tail(3).iloc[::-1].reset_index(drop=True)
+    else:
+        # Only the looked-up ends of the artist's ranking, however many items it has
+        chart_data = rankings.top(artist, comparison_level, variable, CHART_ITEMS)
+        least_items = rankings.bottom(artist, comparison_level, variable, 3)
+
+    # The top 3 most/least {variable} Tracks or Albums
+    top_items = chart_data.head(3).reset_index(drop=True)
+
+    title = f"{artist}'s {comparison_level}s by {variable}"
+    if len(chart_data) == CHART_ITEMS:
+        title += f" (top {CHART_ITEMS})"
+
+    # Create a more stylish bar chart with Track/Album on the x-axis and variable on the y-axis.
+    # One trace coloured bar by bar: a trace per item (px.bar's color=) is what made this slow.
+    palette = px.colors.qualitative.Set3
+    fig = go.Figure(go.Bar(x=chart_data[comparison_level],
+                           y=chart_data[variable],
+                           text=chart_data[variable],
+                           marker_color=[palette[i % len(palette)] for i in range(len(chart_data))]))
+
+    fig.update_traces(texttemplate='%{text:.0f}', textposition='outside')
+    fig.update_layout(
+        title=title,
+        width=800,
+        height=600,
+        showlegend=False,
+        xaxis_title=None,  # Remove x-axis title
+        xaxis=dict(
+            showticklabels=False,  # Hide x-axis tick labels
+            showline=False,        # Hide x-axis line
+            showgrid=False         # Hide x-axis grid lines
+        )
+    )
+
+    # Display the plot
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Display the artist's name as the title
+    st.markdown(f"## {artist}")
+
+    # Display the top/least items in separate tables
+    if comparison_level == "Track":
+        top_tracks, least_tracks = top_items, least_items
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown(f"### Top 3 Tracks With The Most {variable}")
+            top_tracks.index += 1  # Start index from 1
+            st.table(top_tracks[['Track', variable]].style.format({variable: '{:,.0f}'}))
+            
+        with col2:
+            st.markdown(f"### Top 3 Tracks With The Least {variable}")
+            least_tracks.index += 1  # Start index from 1
+            st.table(least_tracks[['Track', variable]].style.format({variable: '{:,.0f}'}))
+    
+    if comparison_level == "Album":
+        top_albums, least_albums = top_items, least_items
+
+        col3, col4 = st.columns(2)
+        with col3:
+            st.markdown(f"### Top 3 Albums With The Most {variable}")
+            top_albums.index += 1  # Start index from 1
+            st.table(top_albums[['Album', variable]].style.format({variable: '{:,.0f}'}))
+            
+        with col4:
+            st.markdown(f"### Top 3 Albums With The Least {variable}")
+            least_albums.index += 1  # Start index from 1
+            st.table(least_albums[['Album', variable]].style.format({variable: '{:,.0f}'}))
+
+
+def render(dataset):
+    artist_index = dataset.artist_index
+
+    # Streamlit application setup
+    st.title("Track & Album Comparison")
+
+    # Sidebar for artist selection
+    artist = st.selectbox("Select an artist:", artist_index.artists)
+
+    # Radio buttons to choose between Track and Album comparison, placed horizontally
+    comparison_level = st.radio("Compare by:", ["Track", "Album"], horizontal=True)
+
+    # Dropdown to choose the variable for the x-axis
+    variable = st.selectbox("Select a variable:", ["Likes", "Comments", "Stream", "Views"])
+
+    # Get the list of tracks or albums based on comparison level
+    items_list = artist_index.items(artist, comparison_level)
+
+    # Multiselect to allow choosing specific tracks or albums
+    selected_items = st.multiselect(f"Select {comparison_level}(s):", items_list)
+
+    # Create the visualization
+    create_artist_comparison(dataset.top_items, artist, comparison_level, variable, selected_items)
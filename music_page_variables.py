@@ -0,0 +1,197 @@
+import numpy as np
+import streamlit as st
+import plotly.express as px
+from music_app import cached_view, export_controls, point_caption
+from music_downsample import downsample_points, render_mode, REPRESENTED_COLUMN
+from music_insights import HISTOGRAM_BINS, SNAP_QUANTILES
+
+# Number of songs shown per page of range filter results
+FILTER_PAGE_SIZE = 100
+
+# Maximum number of matches offered in the search result lists
+SEARCH_LIMIT = 200
+
+
+def variables(artist_index):
+    # Dropdowns for selecting variables
+    variables = ['Danceability', 'Energy', 'Key', 'Loudness', 'Speechiness', 'Acousticness', 
+                 'Instrumentalness', 'Liveness', 'Valence', 'Tempo']
+    
+    x_axis = st.selectbox("Select X-axis variable:", variables, index=0)
+    y_axis = st.selectbox("Select Y-axis variable:", [var for var in variables if var != x_axis], index=1)
+
+    # Dropdown for selecting an artist
+    artist = st.selectbox("Select Artist:", artist_index.artists)
+
+    # Handle NaN values in 'Stream' column; large artists are downsampled before plotting
+    data, total = cached_view(
+        'artist_variables',
+        lambda: downsample_points(artist_index.rows(artist)[['Track', x_axis, y_axis, 'Stream']].dropna(subset=['Stream']),
+                                  x_axis, y_axis, size='Stream'),
+        artists=[artist], x=x_axis, y=y_axis)
+
+    # Create the scatter plot
+    fig = px.scatter(data, x=x_axis, y=y_axis, size='Stream', hover_name='Track',
+                     hover_data={REPRESENTED_COLUMN: len(data) < total},
+                     title=f'{x_axis} vs {y_axis} Scatter Plot',
+                     labels={x_axis: x_axis, y_axis: y_axis, 'Streams': 'Streams'},
+                     template='plotly_white', render_mode=render_mode(len(data)))
+
+    # Update layout
+    fig.update_layout(
+        xaxis_title=x_axis,
+        yaxis_title=y_axis,
+    )
+
+    st.plotly_chart(fig)
+    point_caption(len(data), total)
+
+
+# Function to filter and display songs based on the selected variable and range
+def filter_songs(fetch_rows, feature_index):
+    # List of variables
+    variables = ['Danceability', 'Energy', 'Key', 'Loudness', 'Speechiness', 'Acousticness', 
+                 'Instrumentalness', 'Liveness', 'Valence', 'Tempo']
+    
+    # Dropdown to select the variable
+    selected_variable = st.selectbox("Select the variable to filter by:", variables)
+    
+    # Dual-range slider for the selected variable (bounds come from the sorted index).
+    # Snapped to quantiles, the range moves in steps of 5% of the songs instead.
+    snap = st.toggle("Snap the range to quantiles", value=False)
+    if snap:
+        cuts = cached_view('feature_quantiles', lambda: feature_index.quantiles(selected_variable, SNAP_QUANTILES),
+                           feature=selected_variable)
+        low_q, high_q = st.select_slider(
+            f"Select the range for {selected_variable}:",
+            options=range(len(SNAP_QUANTILES)),
+            value=(0, len(SNAP_QUANTILES) - 1),
+            format_func=lambda i: f"p{SNAP_QUANTILES[i] * 100:.0f} ({cuts[i]:.3g})"
+        )
+        selected_range = (float(cuts[low_q]), float(cuts[high_q]))
+    else:
+        min_val, max_val = feature_index.bounds(selected_variable)
+        selected_range = st.slider(
+            f"Select the range for {selected_variable}:",
+            min_value=float(min_val),
+            max_value=float(max_val),
+            value=(float(min_val), float(max_val)),
+            step=0.01
+        )
+
+    # Distribution of the variable with the selected range highlighted
+    feature_distribution(feature_index, selected_variable, selected_range)
+    
+    # Provide an option to switch the sort order
+    sort_order = st.radio("Sort order:", ["Descending", "Ascending"], horizontal=True)
+
+    # Count the matches with two binary searches on the pre-sorted feature
+    total = feature_index.count(selected_variable, *selected_range)
+
+    # Display the filtered songs one page at a time, index starting from 1
+    if total:
+        st.subheader(f"Songs with {selected_variable} between {selected_range[0]} and {selected_range[1]}")
+        st.write(f"**{total:,} songs found**")
+
+        page_count = (total - 1) // FILTER_PAGE_SIZE + 1
+        page = st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, value=1, step=1)
+
+        def songs_page():
+            row_ids, _ = feature_index.page(selected_variable, *selected_range, page=page - 1,
+                                            page_size=FILTER_PAGE_SIZE, descending=(sort_order == "Descending"))
+            songs = fetch_rows(row_ids)[['Track', selected_variable]].reset_index(drop=True)
+            songs.index = songs.index + 1 + (page - 1) * FILTER_PAGE_SIZE
+            return songs
+
+        filtered_songs = cached_view('filter_page', songs_page, feature=selected_variable, low=selected_range[0],
+                                     high=selected_range[1], order=sort_order, page=page)
+
+        # st.dataframe only renders the rows in view, unlike st.table
+        st.dataframe(filtered_songs, use_container_width=True)
+        st.caption(f"Showing songs {filtered_songs.index[0]:,}-{filtered_songs.index[-1]:,} of {total:,}")
+
+        # Every song in the range, in the chosen order, streamed from the dataset
+        export_controls('filter_songs', fetch_rows,
+                        lambda: feature_index.range_rows(selected_variable, *selected_range,
+                                                         descending=(sort_order == "Descending")),
+                        f"songs_by_{selected_variable.lower()}",
+                        columns=['Track', 'Artist Cleaned', 'Album', 'Genre', selected_variable], total=total,
+                        feature=selected_variable, low=selected_range[0], high=selected_range[1], order=sort_order)
+    else:
+        st.warning("No songs found in the selected range.")
+
+
+# Histogram of a feature from its sorted index, with the bins inside the selected range
+# highlighted and the share of songs the range covers
+def feature_distribution(feature_index, feature, selected_range):
+    edges, counts = cached_view('feature_histogram', lambda: feature_index.histogram(feature, HISTOGRAM_BINS),
+                                feature=feature)
+    total = counts.sum()
+    if not total:
+        return
+
+    centers = (edges[:-1] + edges[1:]) / 2
+    inside = (centers >= selected_range[0]) & (centers <= selected_range[1])
+    fig = px.bar(x=centers, y=counts, color=np.where(inside, 'In range', 'Out of range'),
+                 color_discrete_map={'In range': '#1DB954', 'Out of range': '#555555'},
+                 labels={'x': feature, 'y': 'Songs', 'color': ''}, height=220)
+    fig.update_layout(bargap=0, showlegend=False, margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+
+    share = feature_index.count(feature, *selected_range) / total
+    st.caption(f"The selected range holds {share:.0%} of the songs with a {feature} value")
+
+
+def search(fetch_rows, search_index, search_term):
+    # Convert search term to lowercase for case-insensitive search
+    search_term = search_term.lower()
+
+    # Look up the best matching tracks in the trigram index
+    def matches():
+        row_ids, total = search_index.search(search_term, fields=['Track'], limit=SEARCH_LIMIT)
+        return fetch_rows(row_ids), total
+
+    filtered_data, total = cached_view('track_search', matches, query=search_term.strip())
+
+    # If there are results, display them
+    if not filtered_data.empty:
+        st.write(f"**Found {total} results for:** `{search_term}`")
+        if total > len(filtered_data):
+            st.caption(f"Showing the top {len(filtered_data)} matches.")
+        
+        # Display the results as a selectable list
+        selected_track = st.selectbox("Select a track to see more details:", filtered_data['Track'].unique())
+
+        # Get the details of the selected track
+        track_details = filtered_data[filtered_data['Track'] == selected_track]
+
+        if not track_details.empty:
+            st.write(f"### {selected_track} by {track_details['Artist Cleaned'].values[0]}")
+            st.write(f"**🎵 Danceability:** {track_details['Danceability'].values[0]}")
+            st.write(f"**⚡ Energy:** {track_details['Energy'].values[0]}")
+            st.write(f"**🎹 Key:** {track_details['Key'].values[0]}")
+            st.write(f"**🔊 Loudness:** {track_details['Loudness'].values[0]}")
+            st.write(f"**🗣️ Speechiness:** {track_details['Speechiness'].values[0]}")
+            st.write(f"**🎼 Acousticness:** {track_details['Acousticness'].values[0]}")
+            st.write(f"**🎻 Instrumentalness:** {track_details['Instrumentalness'].values[0]}")
+            st.write(f"**🎤 Liveness:** {track_details['Liveness'].values[0]}")
+            st.write(f"**🎭 Valence:** {track_details['Valence'].values[0]}")
+            st.write(f"**⏱️ Tempo:** {track_details['Tempo'].values[0]}")
+    else:
+        st.write(f"No results found for `{search_term}`")
+
+
+def render(dataset):
+    st.title("Variables Comparison")
+    tab1, tab2, tab3 = st.tabs(["Artist", "Range", "Search"])
+    with tab1:
+        variables(dataset.artist_index)
+    with tab2:
+        filter_songs(dataset.take, dataset.feature_index)
+    with tab3:
+        # Streamlit app setup
+        st.title("Track Search")
+        search_term = st.text_input("Search for a track:")
+
+        if search_term:
+            search(dataset.take, dataset.search_index, search_term)
@@ -0,0 +1,130 @@
+import io
+import os
+import sys
+import time
+import argparse
+import subprocess
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Rerun timings kept per phase; older ones are dropped
+PROFILE_HISTORY = 500
+
+
+# Wall-clock timings of the app's startup and reruns, kept per server process.
+# Phases are named 'import', 'load', 'import <page>', 'render <page>' and 'rerun'. The
+# first timing of a phase is its cold start (module imports, dataset build); the
+# following ones are reruns, summarized as percentiles.
+class RunProfiler:
+    def __init__(self, history=PROFILE_HISTORY):
+        self.history = history
+        self.cold = {}
+        self.runs = {}
+        self.reruns = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self._lock:
+            if phase not in self.cold:
+                self.cold[phase] = seconds
+                self.runs[phase] = 1
+                self.reruns[phase] = deque(maxlen=self.history)
+            else:
+                self.runs[phase] += 1
+                self.reruns[phase].append(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    # One row per phase with its cold start and rerun times in milliseconds
+    def summary(self):
+        rows = []
+        with self._lock:
+            for phase, cold in self.cold.items():
+                reruns = np.array(self.reruns[phase]) * 1000
+                rows.append({
+                    'phase': phase,
+                    'runs': self.runs[phase],
+                    'cold ms': cold * 1000,
+                    'rerun p50 ms': np.median(reruns) if len(reruns) else np.nan,
+                    'rerun p95 ms': np.percentile(reruns, 95) if len(reruns) else np.nan,
+                    'rerun max ms': reruns.max() if len(reruns) else np.nan,
+                })
+        return pd.DataFrame(rows, columns=['phase', 'runs', 'cold ms', 'rerun p50 ms', 'rerun p95 ms',
+                                           'rerun max ms']).set_index('phase')
+
+    def clear(self):
+        with self._lock:
+            self.cold.clear()
+            self.runs.clear()
+            self.reruns.clear()
+
+
+# The profiler app.py reports to; one per process, like the loaded dataset
+PROFILER = RunProfiler()
+
+
+# Open one page in a fresh session of the app and rerun it; returns its profiler timings
+def profile_page(page, reruns):
+    from streamlit.testing.v1 import AppTest
+    # The app reports to the imported module's profiler, not to this script's copy
+    from music_profile import PROFILER as profiler
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    at = AppTest.from_file(app_path, default_timeout=3600)
+    # Open straight on the page, without rendering the default one first
+    at.session_state['page'] = page
+    for _ in range(reruns + 1):
+        at.run()
+    if at.exception:
+        raise SystemExit(f"{page}: {at.exception[0].value}")
+    summary = profiler.summary()
+    return summary[summary.index.isin(['import', 'load', f'import {page}', f'render {page}', 'rerun'])]
+
+
+# Open every page in its own Python process, so each page's first timings are a cold
+# start: its modules are imported and the dataset loaded (or, after the first process
+# has published it, mapped) afresh. numpy, pandas and streamlit are imported by this
+# harness before the app runs, so the 'import' phase is the app's own modules only.
+def main():
+    parser = argparse.ArgumentParser(description="Profile the music app's cold start and reruns, page by page")
+    parser.add_argument('source', help="the dataset CSV to load (MUSIC_DATA_PATH)")
+    parser.add_argument('--reruns', type=int, default=5, help="reruns per page after it is opened")
+    parser.add_argument('--out-of-core', action='store_true', help="load the dataset as with MUSIC_OUT_OF_CORE=1")
+    parser.add_argument('--page', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ['MUSIC_DATA_PATH'] = args.source
+    if args.out_of_core:
+        os.environ['MUSIC_OUT_OF_CORE'] = '1'
+
+    # In a page's own process: print its summary for the parent to collect
+    if args.page is not None:
+        print(profile_page(args.page, args.reruns).reset_index().to_json(orient='records'))
+        return
+
+    from music_app import PAGES
+    summaries = []
+    for page in PAGES:
+        command = [sys.executable, os.path.abspath(__file__), args.source, '--reruns', str(args.reruns),
+                   '--page', page] + (['--out-of-core'] if args.out_of_core else [])
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise SystemExit(f"{page}: {result.stderr.strip() or result.stdout.strip()}")
+        summary = pd.read_json(io.StringIO(result.stdout.strip().splitlines()[-1]), orient='records')
+        summaries.append(summary.assign(page=page).set_index(['page', 'phase']))
+
+    pd.set_option('display.width', 200)
+    print(pd.concat(summaries).round(1).to_string())
+
+
+if __name__ == '__main__':
+    main()
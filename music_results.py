@@ -0,0 +1,96 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Default memory budget of the shared result cache
+DEFAULT_BUDGET_MB = 256
+
+
+# Approximate memory held by a cached result
+def result_size(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(result_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_size(k) + result_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+# Widget values in a canonical, hashable form. Multiselect lists are sorted, since
+# picking the same items in another order gives the same result; NumPy scalars become
+# Python values and floats are rounded so slider noise doesn't create new entries.
+def normalize_state(value):
+    if isinstance(value, (list, tuple, set, frozenset, np.ndarray, pd.Series, pd.Index)):
+        return tuple(sorted((normalize_state(item) for item in value), key=repr))
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+# LRU cache of computed view results shared by every session, bounded by the total
+# size of the cached results. Keys combine the view name, the dataset version the
+# result was computed from and the normalized widget state, so a new dataset version
+# never serves stale results; old entries simply age out.
+class ResultCache:
+    def __init__(self, max_bytes=DEFAULT_BUDGET_MB * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(view, version, **state):
+        return (view, version, tuple(sorted((name, normalize_state(value)) for name, value in state.items())))
+
+    # The cached result for the key, computing and storing it on a miss.
+    # Cached results are shared: callers must copy them before modifying them.
+    def get(self, key, compute):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+
+        # Computed outside the lock so slow views don't block other sessions
+        value = compute()
+        size = result_size(value)
+        with self._lock:
+            if size <= self.max_bytes and key not in self.entries:
+                self.entries[key] = (value, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self.entries.popitem(last=False)
+                    self.bytes -= evicted
+                    self.evictions += 1
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
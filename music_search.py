@@ -0,0 +1,371 @@
+import numpy as np
+import pandas as pd
+
+# Fields searched by the Music Search page, in ranking priority
+SEARCH_FIELDS = ['Track', 'Artist Cleaned', 'Album']
+
+# Match quality tiers (lower is better)
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+# Fuzzy search: terms per field kept from the trigram shortlist, the similarity a term
+# needs to count as a match, and how much popularity weighs against text similarity
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SIMILARITY = 0.5
+POPULARITY_WEIGHT = 0.25
+# Posting entries read when shortlisting; the most common trigrams are skipped beyond this
+FUZZY_MAX_POSTINGS = 1_000_000
+# Query words shorter than this, or made of digits, are never spell-corrected
+MIN_CORRECTED_LENGTH = 3
+# Queries shorter than a trigram are matched as prefixes instead; these score below an
+# exact term so popularity orders them among themselves
+PREFIX_SIMILARITY = 0.75
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Trigrams of a term padded with spaces, so word starts and ends count too
+# and short words still have a few grams to match on
+def padded_trigrams(text):
+    return trigrams(f" {text} ")
+
+
+# Edit distance counting a swap of two neighbouring characters as one edit,
+# the most common typo ("lvoe")
+def edit_distance(a, b):
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        before, previous = previous, current
+    return previous[-1]
+
+
+# The query's words matched against the term's words: each query word takes its closest
+# term word by edit similarity and the results are averaged, so typos inside a longer
+# title ("lvoe" in "crazy in love") still score
+def word_similarity(query_words, term_words):
+    if not term_words:
+        return 0.0
+    total = 0.0
+    for query_word in query_words:
+        best = 0.0
+        for term_word in term_words:
+            longest = max(len(query_word), len(term_word))
+            # The length difference alone caps the similarity; skip words that can't win
+            if 1 - abs(len(query_word) - len(term_word)) / longest > best:
+                best = max(best, 1 - edit_distance(query_word, term_word) / longest)
+        total += best
+    return total / len(query_words)
+
+
+# Text similarity in [0, 1]: the share of the query's trigrams found in the term (so a
+# word inside a longer title still scores high), nudged towards terms of the same length,
+# or the word-level edit similarity when that is higher (typos in short words break
+# most of their trigrams)
+def similarity(query, term, query_grams=None):
+    query_grams = padded_trigrams(query) if query_grams is None else query_grams
+    term_grams = padded_trigrams(term)
+    shared = len(query_grams & term_grams)
+    score = 0.75 * shared / len(query_grams) + 0.25 * 2 * shared / (len(query_grams) + len(term_grams))
+    if score < 1:
+        score = max(score, word_similarity(query.split(), term.split()))
+    return score
+
+
+# Spelling variants used to find words one edit apart: the word and every deletion of one character.
+# Two words within one edit (including a swap of neighbours) always share a variant.
+def deletion_variants(word):
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+# Log-scaled popularity of each row: its Spotify streams or YouTube views, whichever is higher
+def row_popularity(df):
+    stream = df['Stream'].to_numpy(dtype=np.float64, na_value=np.nan)
+    views = df['Views'].to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.log1p(np.nan_to_num(np.fmax(stream, views)).clip(min=0)).astype(np.float32)
+
+
+# Trigram inverted index over one field.
+# The field is reduced to its sorted unique lowercased values ("terms") so repeated
+# artists/albums are indexed once; postings map each trigram to the term ids that
+# contain it, and row_order/offsets map a term back to the dataframe rows holding it.
+class FieldIndex:
+    def __init__(self, values, lower=True, with_postings=True):
+        values = pd.Series(values)
+        # Categoricals can't be filled with a new value ('' for missing) in place
+        values = values.str.lower() if lower else values.astype(object)
+        codes, terms = pd.factorize(values.fillna(''), sort=True)
+        self.build(codes, terms, with_postings)
+
+    # Build from per-row term codes and the sorted unique terms they point into
+    @classmethod
+    def from_codes(cls, codes, terms, with_postings=True):
+        index = cls.__new__(cls)
+        index.build(codes, terms, with_postings)
+        return index
+
+    def build(self, codes, terms, with_postings=True):
+        self.terms = np.asarray(terms, dtype=object)
+
+        # Group row ids by term (CSR layout): rows of term t are row_order[offsets[t]:offsets[t + 1]]
+        self.row_order = np.argsort(codes, kind='stable').astype(np.int32)
+        self.offsets = np.searchsorted(codes[self.row_order], np.arange(len(self.terms) + 1))
+
+        postings = {}
+        self.gram_counts = np.zeros(len(self.terms) if with_postings else 0, dtype=np.int32)
+        if with_postings:
+            for term_id, term in enumerate(self.terms):
+                grams = padded_trigrams(term)
+                self.gram_counts[term_id] = len(grams)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(term_id)
+        # Term ids are appended in increasing order, so every posting list is already sorted
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+        # Vocabulary of words, with their deletion variants, to correct misspelled query words
+        words = set()
+        if with_postings:
+            for term in self.terms:
+                words.update(w for w in term.split() if len(w) >= MIN_CORRECTED_LENGTH and not w.isdigit())
+        self.words = np.array(sorted(words), dtype=object)
+        variants = {}
+        for word_id, word in enumerate(self.words):
+            for variant in deletion_variants(word):
+                variants.setdefault(variant, []).append(word_id)
+        self.word_variants = {variant: np.array(ids, dtype=np.int32) for variant, ids in variants.items()}
+        self.term_popularity = np.zeros(len(self.terms), dtype=np.float32)
+
+    # Popularity of each term: the highest popularity among the rows holding it
+    def set_popularity(self, popularity):
+        if len(self.terms):
+            self.term_popularity = np.maximum.reduceat(popularity[self.row_order], self.offsets[:-1])
+
+    # Row positions holding the exact term, or an empty array
+    def rows_for_value(self, value):
+        term_id = np.searchsorted(self.terms, value)
+        if term_id == len(self.terms) or self.terms[term_id] != value:
+            return np.array([], dtype=np.int32)
+        return self.row_order[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    # Term ids whose text starts with the query (binary search on the sorted terms)
+    def prefix_terms(self, query):
+        lo = np.searchsorted(self.terms, query, side='left')
+        hi = np.searchsorted(self.terms, query + '\uffff', side='left')
+        return np.arange(lo, hi, dtype=np.int32)
+
+    # Term ids whose text contains the query
+    def substring_terms(self, query):
+        if len(query) < 3:
+            # Too short for trigrams: scan the unique terms (far fewer than rows)
+            return np.array([i for i, term in enumerate(self.terms) if query in term], dtype=np.int32)
+
+        # Intersect the posting lists, shortest first, then confirm the match
+        lists = [self.postings.get(gram) for gram in trigrams(query)]
+        if any(ids is None for ids in lists):
+            return np.array([], dtype=np.int32)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+        return np.array([i for i in candidates if query in self.terms[i]], dtype=np.int32)
+
+    # Indexed words one edit away from a word that is not indexed itself
+    def corrections(self, word):
+        if len(word) < MIN_CORRECTED_LENGTH or word.isdigit():
+            return []
+        position = np.searchsorted(self.words, word)
+        if position < len(self.words) and self.words[position] == word:
+            return []
+        ids = [self.word_variants[v] for v in deletion_variants(word) if v in self.word_variants]
+        if not ids:
+            return []
+        return [self.words[i] for i in np.unique(np.concatenate(ids)) if edit_distance(word, self.words[i]) == 1]
+
+    # Term ids most similar to the query, with their similarity, best first.
+    # Candidates come from the posting lists of the query's trigrams and of the corrections
+    # of its misspelled words: terms sharing the most grams (ties broken by popularity)
+    # are shortlisted, then scored exactly. Queries too short for a trigram fall back to
+    # the terms starting with them, the most popular first.
+    def fuzzy_terms(self, query, candidates=FUZZY_CANDIDATES, min_similarity=FUZZY_MIN_SIMILARITY):
+        if len(query) < 3:
+            return self.short_prefix_terms(query, candidates)
+        query_grams = padded_trigrams(query)
+        search_grams = set(query_grams)
+        for word in query.split():
+            for correction in self.corrections(word):
+                search_grams |= padded_trigrams(correction)
+        lists = sorted((self.postings[gram] for gram in search_grams if gram in self.postings), key=len)
+        used, size = [], 0
+        for ids in lists:
+            if used and size + len(ids) > FUZZY_MAX_POSTINGS:
+                break
+            used.append(ids)
+            size += len(ids)
+        if not used:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+
+        term_ids, shared = np.unique(np.concatenate(used), return_counts=True)
+        estimate = (0.75 * shared / len(query_grams)
+                    + 0.5 * shared / (len(query_grams) + self.gram_counts[term_ids])
+                    + POPULARITY_WEIGHT * self.term_popularity[term_ids])
+        if len(term_ids) > candidates:
+            top = np.argpartition(-estimate, candidates - 1)[:candidates]
+            term_ids = term_ids[top]
+
+        scores = np.array([similarity(query, self.terms[t], query_grams) for t in term_ids], dtype=np.float32)
+        keep = scores >= min_similarity
+        term_ids, scores = term_ids[keep].astype(np.int32), scores[keep]
+        order = np.argsort(-scores, kind='stable')
+        return term_ids[order], scores[order]
+
+    # Up to `candidates` term ids starting with the query, most popular first, scored
+    # 1 for the term equal to the query and PREFIX_SIMILARITY for the others
+    def short_prefix_terms(self, query, candidates=FUZZY_CANDIDATES):
+        term_ids = self.prefix_terms(query)
+        order = np.argsort(-self.term_popularity[term_ids], kind='stable')[:candidates]
+        term_ids = term_ids[order]
+        scores = np.where(self.terms[term_ids] == query, 1.0, PREFIX_SIMILARITY).astype(np.float32)
+        order = np.argsort(-scores, kind='stable')
+        return term_ids[order], scores[order]
+
+    def rows_for_terms(self, term_ids):
+        starts = self.offsets[term_ids]
+        counts = self.offsets[term_ids + 1] - starts
+        # Gather all the CSR ranges at once instead of concatenating one slice per term
+        positions = np.arange(counts.sum()) + np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.row_order[positions]
+
+    # Matching rows with their tier (exact, prefix or substring)
+    def match(self, query, prefix_only=False):
+        prefix = self.prefix_terms(query)
+        if prefix_only:
+            matched = prefix
+        else:
+            matched = self.substring_terms(query)
+
+        term_tiers = np.full(len(matched), SUBSTRING, dtype=np.int8)
+        term_tiers[np.isin(matched, prefix)] = PREFIX
+        term_tiers[self.terms[matched] == query] = EXACT
+
+        rows = self.rows_for_terms(matched)
+        counts = self.offsets[matched + 1] - self.offsets[matched]
+        return rows, np.repeat(term_tiers, counts)
+
+
+# Collects a field chunk by chunk, for datasets that are never fully in memory.
+# Each chunk's values are mapped onto a growing vocabulary; build() sorts the
+# vocabulary and remaps the codes so the result equals FieldIndex(all values).
+class FieldIndexBuilder:
+    def __init__(self, lower=True, with_postings=True):
+        self.lower = lower
+        self.with_postings = with_postings
+        self.vocabulary = {}
+        self.chunks = []
+
+    def add(self, values):
+        values = pd.Series(values)
+        # Categoricals can't be filled with a new value ('' for missing) in place
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        if self.lower:
+            values = values.str.lower()
+        codes, uniques = pd.factorize(values.fillna(''))
+        ids = np.array([self.vocabulary.setdefault(value, len(self.vocabulary)) for value in uniques], dtype=np.int64)
+        self.chunks.append(ids[codes] if len(codes) else np.array([], dtype=np.int64))
+
+    def build(self):
+        terms = np.array(list(self.vocabulary), dtype=object)
+        order = np.argsort(terms, kind='stable')
+        remap = np.empty(len(terms), dtype=np.int64)
+        remap[order] = np.arange(len(terms))
+        codes = remap[np.concatenate(self.chunks)] if self.chunks else np.array([], dtype=np.int64)
+        return FieldIndex.from_codes(codes, terms[order], self.with_postings)
+
+
+# Keep each row once with its best (lowest) score
+def best_per_row(rows, scores):
+    order = np.lexsort((rows, scores))
+    rows, scores = rows[order], scores[order]
+    _, first = np.unique(rows, return_index=True)
+    return rows[first], scores[first]
+
+
+# The `limit` rows with the lowest scores, ties in file order
+def top_rows(rows, scores, limit):
+    order = np.lexsort((rows, scores))[:limit]
+    return rows[order], scores[order]
+
+
+class MusicSearchIndex:
+    # `popularity` holds row_popularity() of every row; it is taken from df when not given.
+    # It is divided by `popularity_scale` (by default its maximum) to fall in [0, 1].
+    def __init__(self, df=None, fields=SEARCH_FIELDS, indexes=None, popularity=None, popularity_scale=None):
+        self.fields = list(fields)
+        if indexes is None:
+            indexes = {field: FieldIndex(df[field]) for field in self.fields}
+        self.indexes = indexes
+
+        if popularity is None:
+            popularity = row_popularity(df) if df is not None else np.zeros(0, dtype=np.float32)
+        if popularity_scale is None:
+            popularity_scale = float(popularity.max()) if len(popularity) else 0.0
+        self.popularity_scale = popularity_scale
+        # Scaled to [0, 1] so it can be blended with text similarity
+        scaled = (popularity / popularity_scale).clip(max=1) if popularity_scale > 0 else popularity
+        self.popularity = scaled.astype(np.float32)
+        for index in self.indexes.values():
+            index.set_popularity(self.popularity)
+
+    # Every row matching the (lowercased) query once, with its score: tier first, then
+    # field priority (Track before Artist before Album); lower is better
+    def matches(self, query, fields=None, prefix_only=False):
+        fields = self.fields if fields is None else fields
+        if not query:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.int32)
+
+        all_rows, all_scores = [], []
+        for rank, field in enumerate(fields):
+            rows, tiers = self.indexes[field].match(query, prefix_only)
+            all_rows.append(rows)
+            all_scores.append(tiers.astype(np.int32) * len(fields) + rank)
+        return best_per_row(np.concatenate(all_rows), np.concatenate(all_scores))
+
+    # Search the given fields for a (case-insensitive) substring.
+    # With prefix_only=True only values starting with the query match (search-as-you-type).
+    # Returns the top `limit` row positions, best match first, and the total number of matches.
+    def search(self, query, fields=None, limit=100, prefix_only=False):
+        rows, scores = self.matches(query.lower().strip(), fields, prefix_only)
+        return top_rows(rows, scores, limit)[0], len(rows)
+
+    # Every row close to the (lowercased) query once, with its score: text similarity
+    # blended with popularity, negated so that lower is better
+    def fuzzy_matches(self, query, fields=None):
+        fields = self.fields if fields is None else fields
+        if not query:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+
+        all_rows, all_scores = [], []
+        for field in fields:
+            index = self.indexes[field]
+            term_ids, scores = index.fuzzy_terms(query)
+            counts = index.offsets[term_ids + 1] - index.offsets[term_ids]
+            all_rows.append(index.rows_for_terms(term_ids))
+            all_scores.append(np.repeat(scores, counts))
+
+        rows = np.concatenate(all_rows)
+        scores = (1 - POPULARITY_WEIGHT) * np.concatenate(all_scores) + POPULARITY_WEIGHT * self.popularity[rows]
+        return best_per_row(rows, -scores.astype(np.float32))
+
+    # Typo-tolerant search ranked by text similarity blended with popularity, so
+    # "beyonse" still finds Beyoncé and "love" lists the most played love songs first.
+    # Returns the top `limit` row positions and their scores, best first.
+    def ranked_search(self, query, fields=None, limit=50):
+        rows, scores = top_rows(*self.fuzzy_matches(query.lower().strip(), fields), limit)
+        return rows, -scores
@@ -0,0 +1,194 @@
+import os
+import glob
+import json
+import mmap
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from music_data import (HAS_PYARROW, FEATURE_COLUMNS, UPSERT_KEYS, load_dataset, cache_paths, read_meta, cache_is_fresh,
+                        key_hashes)
+from music_aggregates import track_sums, item_sums, track_key_hashes, build_genre_cube, build_genre_artist_cube, build_track_cube
+from music_index import group_by_artist, ArtistIndex, FeatureIndex, TopItemsIndex
+from music_search import MusicSearchIndex
+from music_similar import FeatureNeighbors
+from music_insights import FeatureStats
+
+if HAS_PYARROW:
+    import pyarrow as pa
+
+# Out-of-band array buffers are aligned like Arrow buffers
+BUFFER_ALIGNMENT = 64
+# Bump whenever MusicDataset gains or changes attributes so older published copies are ignored
+SHARED_FORMAT = 8
+# Prefix of the mask column published next to every nullable integer column
+MASK_PREFIX = '__mask__'
+
+
+# The in-memory dataset: the frame grouped by artist plus every derived index.
+# Offers the same attributes as music_ingest.IngestedDataset.
+class MusicDataset:
+    def __init__(self, df, version):
+        self.version = version
+        self.df = df
+        self.sums = sums = track_sums(df)
+        # Key hashes of the rows and of the sums, used by music_updates to apply upserts
+        self.row_keys = key_hashes(df, UPSERT_KEYS)
+        self.sums_keys = track_key_hashes(sums)
+        self.genre_cube = build_genre_cube(sums)
+        self.artist_cube = build_genre_artist_cube(sums)
+        self.track_cube = build_track_cube(sums)
+        self.search_index = MusicSearchIndex(df)
+        self.artist_index = ArtistIndex(df)
+        self.top_items = TopItemsIndex(item_sums(df))
+        self.feature_index = FeatureIndex(df, FEATURE_COLUMNS)
+        self.feature_stats = FeatureStats.from_frame(df)
+        self.similar_index = FeatureNeighbors.from_frame(df, FEATURE_COLUMNS)
+
+    def __len__(self):
+        return len(self.df)
+
+    def take(self, row_ids, columns=None):
+        if columns is not None:
+            return self.df[columns].iloc[row_ids]
+        return self.df.iloc[row_ids]
+
+    # Version of the data behind a view of some genres/artists (see music_updates.LayeredDataset)
+    def view_version(self, genres=None, artists=None):
+        return self.version
+
+
+def shared_dir(path, version, cache_dir=None):
+    parquet_path, _ = cache_paths(path, cache_dir)
+    return os.path.splitext(parquet_path)[0] + f".shared-{version}-v{SHARED_FORMAT}"
+
+
+# The frame as an Arrow table whose columns all convert back to pandas without a copy.
+# Nullable integers (the counts) would come back as freshly allocated masked arrays, so
+# each is written as plain integers plus a byte mask column.
+def frame_table(df):
+    columns = {}
+    masks = {}
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.array, pd.arrays.IntegerArray):
+            columns[col] = values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0)
+            masks[MASK_PREFIX + col] = values.isna().to_numpy().view(np.uint8)
+        else:
+            columns[col] = values
+    return pa.Table.from_pandas(pd.DataFrame({**columns, **masks}, copy=False), preserve_index=False)
+
+
+# Inverse of frame_table(): the integer values and their masks are wrapped back into
+# nullable integer arrays in place, pointing into the same memory map
+def table_frame(table):
+    masks = [name for name in table.column_names if name.startswith(MASK_PREFIX)]
+    df = table.drop_columns(masks).to_pandas(split_blocks=True)
+    columns = {col: df[col] for col in df.columns}
+    for name in masks:
+        col = name[len(MASK_PREFIX):]
+        mask = table.column(name).to_numpy().view(bool)
+        columns[col] = pd.Series(pd.arrays.IntegerArray(columns[col].to_numpy(), mask), copy=False)
+    return pd.DataFrame(columns, copy=False)
+
+
+# Write the dataset so other processes can memory-map it:
+#   frame.arrow    the frame as an Arrow IPC file (see frame_table)
+#   indexes.pkl    the indexes pickled (protocol 5) with every array buffer kept out of band
+#   indexes.bin    those array buffers, aligned, with their offsets in indexes.json
+def publish_shared(dataset, directory):
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir)
+
+    table = frame_table(dataset.df)
+    with pa.OSFile(os.path.join(tmp_dir, 'frame.arrow'), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    state = dataset.__dict__.copy()
+    del state['df']
+    buffers = []
+    payload = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+
+    layout = []
+    offset = 0
+    with open(os.path.join(tmp_dir, 'indexes.bin'), 'wb') as f:
+        for buffer in buffers:
+            raw = buffer.raw()
+            padding = -offset % BUFFER_ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            f.write(raw)
+            layout.append((offset, raw.nbytes))
+            offset += raw.nbytes
+    with open(os.path.join(tmp_dir, 'indexes.pkl'), 'wb') as f:
+        f.write(payload)
+    with open(os.path.join(tmp_dir, 'indexes.json'), 'w') as f:
+        json.dump(layout, f)
+
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Open a published dataset. The bulk of it points into read-only memory maps, so every
+# process shares the same physical pages: the frame's numeric columns, categorical codes
+# and Arrow-backed text columns (pandas' default string type since 3.0), and every numeric
+# array of the indexes. Each process still builds its own copy of the small parts made of
+# Python objects: the categories, the search vocabularies (FieldIndex terms and words)
+# and the dicts from trigrams and spelling variants to their posting arrays.
+def open_shared(directory):
+    source = pa.memory_map(os.path.join(directory, 'frame.arrow'), 'r')
+    df = table_frame(pa.ipc.open_file(source).read_all())
+
+    with open(os.path.join(directory, 'indexes.json')) as f:
+        layout = json.load(f)
+    buffers = []
+    if layout:
+        with open(os.path.join(directory, 'indexes.bin'), 'rb') as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        buffers = [view[offset:offset + size] for offset, size in layout]
+    with open(os.path.join(directory, 'indexes.pkl'), 'rb') as f:
+        state = pickle.loads(f.read(), buffers=buffers)
+
+    dataset = MusicDataset.__new__(MusicDataset)
+    dataset.__dict__.update(state)
+    dataset.df = df
+    dataset.artist_index.df = df
+    return dataset
+
+
+# Remove shared copies of older dataset versions (best effort: on Windows a copy
+# still mapped by another process cannot be deleted yet)
+def remove_stale_shared(path, version, cache_dir=None):
+    current = shared_dir(path, version, cache_dir)
+    for directory in glob.glob(os.path.splitext(cache_paths(path, cache_dir)[0])[0] + '.shared-*'):
+        if directory != current and '.tmp-' not in directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+# Load the dataset and its indexes once per server. The first process builds and
+# publishes them; every later process (and every session) maps the same files.
+def load_shared(path, cache_dir=None):
+    if not HAS_PYARROW:
+        df, version = load_dataset(path, cache_dir)
+        return MusicDataset(group_by_artist(df), version)
+
+    parquet_path, meta_path = cache_paths(path, cache_dir)
+    meta = read_meta(meta_path)
+    if os.path.exists(parquet_path) and cache_is_fresh(path, meta):
+        directory = shared_dir(path, meta['source_sha256'][:12], cache_dir)
+        if os.path.isdir(directory):
+            return open_shared(directory)
+
+    df, version = load_dataset(path, cache_dir)
+    directory = shared_dir(path, version, cache_dir)
+    if not os.path.isdir(directory):
+        publish_shared(MusicDataset(group_by_artist(df), version), directory)
+        remove_stale_shared(path, version, cache_dir)
+    del df
+    return open_shared(directory)
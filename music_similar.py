@@ -0,0 +1,148 @@
+import heapq
+import numpy as np
+
+# Points per KD-tree leaf; leaves are scanned with one vectorized distance computation
+LEAF_SIZE = 256
+# Rows per block when scanning every point in brute-force mode
+BRUTE_FORCE_BLOCK = 1 << 18
+
+
+# k-nearest-neighbour index over the audio features.
+# Features are z-score normalized so no single scale (Tempo, Loudness) dominates;
+# rows with a missing feature are left out. The KD-tree keeps each leaf's points
+# contiguous in `points`, with `row_ids` mapping them back to dataframe rows.
+class FeatureNeighbors:
+    def __init__(self, arrays, leaf_size=LEAF_SIZE):
+        self.features = list(arrays)
+        matrix = np.column_stack([np.asarray(arrays[f], dtype=np.float64) for f in self.features])
+        valid = ~np.isnan(matrix).any(axis=1)
+
+        self.mean = matrix[valid].mean(axis=0) if valid.any() else np.zeros(len(self.features))
+        std = matrix[valid].std(axis=0) if valid.any() else np.ones(len(self.features))
+        self.std = np.where(std > 0, std, 1.0)
+
+        self.row_ids = np.flatnonzero(valid).astype(np.int64)
+        self.points = ((matrix[valid] - self.mean) / self.std).astype(np.float32)
+        del matrix
+        self.build_tree(leaf_size)
+
+    @classmethod
+    def from_frame(cls, df, features, leaf_size=LEAF_SIZE):
+        return cls({f: df[f].to_numpy(dtype=np.float64, na_value=np.nan) for f in features}, leaf_size)
+
+    # Split on the widest dimension at the median until nodes hold at most leaf_size points.
+    # Nodes are stored in flat arrays: point range [start, stop), children (-1 for a leaf)
+    # and the bounding box used to prune the search.
+    def build_tree(self, leaf_size):
+        order = np.arange(len(self.points))
+        starts, stops, lefts, rights, box_min, box_max = [], [], [], [], [], []
+
+        def add_node(start, stop):
+            block = self.points[order[start:stop]]
+            starts.append(start)
+            stops.append(stop)
+            lefts.append(-1)
+            rights.append(-1)
+            box_min.append(block.min(axis=0) if len(block) else np.zeros(self.points.shape[1], np.float32))
+            box_max.append(block.max(axis=0) if len(block) else np.zeros(self.points.shape[1], np.float32))
+            return len(starts) - 1
+
+        stack = [add_node(0, len(order))]
+        while stack:
+            node = stack.pop()
+            start, stop = starts[node], stops[node]
+            if stop - start <= leaf_size:
+                continue
+            dim = int(np.argmax(box_max[node] - box_min[node]))
+            middle = (start + stop) // 2
+            segment = order[start:stop]
+            split = np.argpartition(self.points[segment, dim], middle - start)
+            order[start:stop] = segment[split]
+            lefts[node] = add_node(start, middle)
+            rights[node] = add_node(middle, stop)
+            stack.extend([lefts[node], rights[node]])
+
+        # Store the points in leaf order so every leaf is one contiguous slice
+        self.points = self.points[order]
+        self.row_ids = self.row_ids[order]
+        self.node_start = np.array(starts, dtype=np.int64)
+        self.node_stop = np.array(stops, dtype=np.int64)
+        self.node_left = np.array(lefts, dtype=np.int64)
+        self.node_right = np.array(rights, dtype=np.int64)
+        self.box_min = np.array(box_min, dtype=np.float32).reshape(-1, self.points.shape[1])
+        self.box_max = np.array(box_max, dtype=np.float32).reshape(-1, self.points.shape[1])
+
+    def normalize(self, values):
+        return ((np.asarray(values, dtype=np.float64) - self.mean) / self.std).astype(np.float32)
+
+    # Position of a dataframe row inside `points`, or None when it has missing features
+    def point_of_row(self, row_id):
+        if not hasattr(self, '_point_of_row'):
+            lookup = np.full(int(self.row_ids.max()) + 1 if len(self.row_ids) else 0, -1, dtype=np.int64)
+            lookup[self.row_ids] = np.arange(len(self.row_ids))
+            self._point_of_row = lookup
+        if row_id >= len(self._point_of_row) or self._point_of_row[row_id] < 0:
+            return None
+        return int(self._point_of_row[row_id])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_point_of_row', None)
+        return state
+
+    # Best-first KD-tree search; returns (row_ids, distances) sorted by distance
+    def query_vector(self, vector, k=10, exclude=()):
+        x = self.normalize(vector)
+        best_dist = np.empty(0, dtype=np.float32)
+        best_pos = np.empty(0, dtype=np.int64)
+        excluded = np.array([p for p in exclude if p is not None], dtype=np.int64)
+        heap = [(0.0, 0)] if len(self.points) else []
+
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if len(best_dist) == k and bound > best_dist[-1]:
+                break
+            if self.node_left[node] < 0:
+                start, stop = self.node_start[node], self.node_stop[node]
+                dist = ((self.points[start:stop] - x) ** 2).sum(axis=1)
+                pos = np.arange(start, stop)
+                if len(excluded):
+                    keep = ~np.isin(pos, excluded)
+                    dist, pos = dist[keep], pos[keep]
+                best_dist = np.concatenate([best_dist, dist])
+                best_pos = np.concatenate([best_pos, pos])
+                if len(best_dist) > k:
+                    top = np.argpartition(best_dist, k - 1)[:k]
+                    best_dist, best_pos = best_dist[top], best_pos[top]
+                order = np.argsort(best_dist, kind='stable')
+                best_dist, best_pos = best_dist[order], best_pos[order]
+            else:
+                for child in (self.node_left[node], self.node_right[node]):
+                    gap = np.maximum(self.box_min[child] - x, 0) + np.maximum(x - self.box_max[child], 0)
+                    heapq.heappush(heap, (float((gap ** 2).sum()), int(child)))
+
+        return self.row_ids[best_pos], np.sqrt(best_dist)
+
+    # Exact scan over every point, kept to verify the tree's results
+    def brute_force_vector(self, vector, k=10, exclude=()):
+        x = self.normalize(vector)
+        dist = np.empty(len(self.points), dtype=np.float32)
+        for start in range(0, len(self.points), BRUTE_FORCE_BLOCK):
+            block = self.points[start:start + BRUTE_FORCE_BLOCK]
+            dist[start:start + len(block)] = ((block - x) ** 2).sum(axis=1)
+        for p in exclude:
+            if p is not None:
+                dist[p] = np.inf
+        k = min(k, int(np.isfinite(dist).sum()))
+        top = np.argpartition(dist, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+        top = top[np.argsort(dist[top], kind='stable')]
+        return self.row_ids[top], np.sqrt(dist[top])
+
+    # The k tracks closest to a dataframe row (the row itself is excluded)
+    def similar(self, row_id, k=10, exact=False):
+        point = self.point_of_row(row_id)
+        if point is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        vector = self.points[point] * self.std + self.mean
+        search = self.brute_force_vector if exact else self.query_vector
+        return search(vector, k, exclude=(point,))
@@ -0,0 +1,359 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from music_data import (CSV_ENCODING, UPSERT_KEYS, apply_schema, cache_paths, read_meta, write_meta, cache_is_fresh,
+                        file_sha256, key_hashes)
+from music_aggregates import track_sums_change, update_track_sums, update_cubes, item_sums
+from music_index import FeatureIndex, TopItemsIndex
+from music_insights import FeatureStats
+from music_search import MusicSearchIndex, top_rows
+
+# Column of the delta file recording which update last wrote each row
+UPDATE_COLUMN = '_update'
+
+
+# Version of the current source CSV, the same value load_dataset() reports.
+# The Parquet cache metadata is reused when fresh so the file is not hashed again.
+def source_version(path, cache_dir=None):
+    for variant in ('', '.rows'):
+        meta = read_meta(cache_paths(path, cache_dir, variant)[1])
+        if meta and cache_is_fresh(path, meta):
+            return meta['source_sha256'][:12]
+    return file_sha256(path)[:12]
+
+
+def delta_paths(path, cache_dir=None):
+    return cache_paths(path, cache_dir, variant='.delta')
+
+
+# Rows upserted since the CSV was last replaced, and their metadata:
+#   base_version  version of the CSV the rows apply to (a new CSV discards them)
+#   sequence      number of the last update
+#   changes       genres/artists of rows that a later update overwrote in the delta
+def read_delta(path, cache_dir=None):
+    delta_path, meta_path = delta_paths(path, cache_dir)
+    meta = read_meta(meta_path)
+    if not meta or not os.path.exists(delta_path):
+        return None, None
+    return apply_schema(pd.read_parquet(delta_path)), meta
+
+
+# Cheap key that changes whenever an update is applied
+def delta_signature(path, cache_dir=None):
+    _, meta_path = delta_paths(path, cache_dir)
+    if not os.path.exists(meta_path):
+        return None
+    stat = os.stat(meta_path)
+    return (stat.st_mtime, stat.st_size)
+
+
+# Append new rows and replace existing ones (matched on UPSERT_KEYS, last one wins).
+# The rows are kept in a delta file next to the cache instead of rewriting the
+# dataset; with_updates() layers them over the loaded data. Returns the update number.
+def upsert_rows(path, rows, cache_dir=None):
+    missing = [key for key in UPSERT_KEYS if key not in rows.columns]
+    if missing:
+        raise ValueError(f"Updated rows need the {', '.join(missing)} column(s) to be matched")
+
+    version = source_version(path, cache_dir)
+    delta, meta = read_delta(path, cache_dir)
+    if meta is None or meta['base_version'] != version:
+        delta, meta = None, {'base_version': version, 'sequence': 0, 'changes': []}
+
+    sequence = meta['sequence'] + 1
+    rows = rows.copy()
+    rows[UPDATE_COLUMN] = sequence
+    rows = rows[~pd.Series(key_hashes(rows, UPSERT_KEYS)).duplicated(keep='last').to_numpy()]
+
+    if delta is not None:
+        overwritten = np.isin(key_hashes(delta, UPSERT_KEYS), key_hashes(rows, UPSERT_KEYS))
+        # Their genres/artists change too, and the row itself is about to disappear
+        if overwritten.any():
+            old = delta[overwritten]
+            meta['changes'].append({'sequence': sequence,
+                                    'genres': old['Genre'].dropna().astype(str).unique().tolist(),
+                                    'artists': old['Artist Cleaned'].dropna().astype(str).unique().tolist()})
+        rows = pd.concat([delta[~overwritten], rows], ignore_index=True)
+
+    delta_path, meta_path = delta_paths(path, cache_dir)
+    os.makedirs(os.path.dirname(delta_path), exist_ok=True)
+    tmp_path = delta_path + '.tmp'
+    apply_schema(rows.reset_index(drop=True)).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, delta_path)
+    meta['sequence'] = sequence
+    write_meta(meta_path, meta)
+    return sequence
+
+
+# The base artist index with replaced rows left out and delta rows added.
+# Row ids point into the layered dataset (delta rows come after the base rows).
+class LayeredArtistIndex:
+    def __init__(self, base, live, delta, offset, take, removed_artists):
+        self.base = base
+        self.live = live
+        self.take = take
+        ids = pd.Series(np.arange(len(delta)) + offset)
+        names = delta['Artist Cleaned'].astype(object).to_numpy()
+        self.delta_rows = {artist: group.to_numpy() for artist, group in ids.groupby(names)}
+
+        # Base artists whose every row was replaced disappear
+        dead = {artist for artist in set(removed_artists.dropna().astype(str)) - set(self.delta_rows)
+                if not live[base.row_ids(artist)].any()}
+        self.artists = sorted((set(base.artists) - dead) | set(self.delta_rows))
+        self._items = {}
+
+    def __contains__(self, artist):
+        return len(self.row_ids(artist)) > 0
+
+    def row_ids(self, artist):
+        ids = self.base.row_ids(artist) if artist in self.base else np.array([], dtype=np.int64)
+        return np.concatenate([ids[self.live[ids]], self.delta_rows.get(artist, np.array([], dtype=np.int64))])
+
+    def rows(self, artist):
+        return self.take(self.row_ids(artist))
+
+    def rows_for(self, artists):
+        return self.take(np.concatenate([self.row_ids(artist) for artist in artists]))
+
+    def items(self, artist, level):
+        key = (artist, level)
+        if key not in self._items:
+            self._items[key] = self.take(self.row_ids(artist), columns=[level])[level].dropna().unique().tolist()
+        return self._items[key]
+
+    def tracks(self, artist):
+        return self.items(artist, 'Track')
+
+    def albums(self, artist):
+        return self.items(artist, 'Album')
+
+
+# The base top item tables, with the artists an update touched re-ranked from their
+# current rows (`rows`: every live row of those artists)
+class LayeredTopItems:
+    def __init__(self, base, rows, artists):
+        self.base = base
+        self.changed = set(artists)
+        self.delta = TopItemsIndex(item_sums(rows))
+
+    def index(self, artist):
+        return self.delta if artist in self.changed else self.base
+
+    def ranked(self, artist, level, metric):
+        return self.index(artist).ranked(artist, level, metric)
+
+    def top(self, artist, level, metric, n):
+        return self.index(artist).top(artist, level, metric, n)
+
+    def bottom(self, artist, level, metric, n):
+        return self.index(artist).bottom(artist, level, metric, n)
+
+
+# Substring and fuzzy search over the base index (replaced rows filtered out) and a
+# small index over the delta rows, merged into one ranking
+class LayeredSearchIndex:
+    def __init__(self, base, live, delta, offset):
+        self.base = base
+        self.live = live
+        self.offset = offset
+        self.fields = base.fields
+        self.delta = MusicSearchIndex(delta, base.fields, popularity_scale=base.popularity_scale)
+
+    def merged(self, base_matches, delta_matches):
+        rows, scores = base_matches
+        keep = self.live[rows]
+        delta_rows, delta_scores = delta_matches
+        return (np.concatenate([rows[keep].astype(np.int64), delta_rows.astype(np.int64) + self.offset]),
+                np.concatenate([scores[keep], delta_scores]))
+
+    def search(self, query, fields=None, limit=100, prefix_only=False):
+        query = query.lower().strip()
+        rows, scores = self.merged(self.base.matches(query, fields, prefix_only),
+                                   self.delta.matches(query, fields, prefix_only))
+        return top_rows(rows, scores, limit)[0], len(rows)
+
+    def ranked_search(self, query, fields=None, limit=50):
+        query = query.lower().strip()
+        rows, scores = top_rows(*self.merged(self.base.fuzzy_matches(query, fields),
+                                             self.delta.fuzzy_matches(query, fields)), limit)
+        return rows, -scores
+
+
+# Range filter over the base and delta rows. Each feature's merged order is built
+# the first time it is filtered on, by dropping replaced rows from the base order and
+# inserting the (few) delta rows at their sorted positions.
+class LayeredFeatureIndex(FeatureIndex):
+    def __init__(self, base, live, delta, offset):
+        self.base = base
+        self.live = live
+        self.delta_values = {f: delta[f].to_numpy(dtype=np.float64, na_value=np.nan) for f in base.order}
+        self.offset = offset
+        self.order = {}
+        self.values = {}
+
+    def load(self, feature):
+        if feature not in self.order:
+            order = self.base.order[feature]
+            keep = self.live[order]
+            order, values = order[keep], self.base.values[feature][keep]
+
+            delta_values = self.delta_values[feature]
+            delta_order = np.argsort(delta_values, kind='stable')[:np.count_nonzero(~np.isnan(delta_values))]
+            positions = np.searchsorted(values, delta_values[delta_order], side='right')
+            self.order[feature] = np.insert(order.astype(np.int64), positions, delta_order + self.offset)
+            self.values[feature] = np.insert(values, positions, delta_values[delta_order])
+
+    def bounds(self, feature):
+        self.load(feature)
+        return super().bounds(feature)
+
+    def sorted_values(self, feature):
+        self.load(feature)
+        return super().sorted_values(feature)
+
+    def span(self, feature, low, high):
+        self.load(feature)
+        return super().span(feature, low, high)
+
+
+# Nearest neighbours from the base KD-tree (replaced rows excluded) merged with a
+# brute-force scan of the delta rows, in the base's normalized feature space
+class LayeredNeighbors:
+    def __init__(self, base, live, delta, offset):
+        self.base = base
+        self.offset = offset
+        self.excluded = tuple(base.point_of_row(row) for row in np.flatnonzero(~live))
+        matrix = np.column_stack([delta[f].to_numpy(dtype=np.float64, na_value=np.nan) for f in base.features])
+        valid = ~np.isnan(matrix).any(axis=1)
+        self.delta_matrix = matrix
+        self.delta_valid = valid
+        self.delta_points = base.normalize(matrix[valid])
+        self.delta_ids = np.flatnonzero(valid) + offset
+
+    def similar(self, row_id, k=10, exact=False):
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if row_id < self.offset:
+            point = self.base.point_of_row(row_id)
+            if point is None or point in self.excluded:
+                return empty
+            vector = self.base.points[point] * self.base.std + self.base.mean
+        else:
+            point = None
+            if not self.delta_valid[row_id - self.offset]:
+                return empty
+            vector = self.delta_matrix[row_id - self.offset]
+
+        search = self.base.brute_force_vector if exact else self.base.query_vector
+        ids, distances = search(vector, k, exclude=(point,) + self.excluded)
+
+        delta_distances = np.sqrt(((self.delta_points - self.base.normalize(vector)) ** 2).sum(axis=1))
+        keep = self.delta_ids != row_id
+        ids = np.concatenate([ids, self.delta_ids[keep]])
+        distances = np.concatenate([distances, delta_distances[keep]])
+        order = np.argsort(distances, kind='stable')[:k]
+        return ids[order], distances[order]
+
+
+# A loaded dataset (music_shared.MusicDataset or music_ingest.IngestedDataset) with
+# the delta rows layered over it. Nothing is rebuilt from the raw rows: the track sums
+# and cubes are patched with the replaced and added rows, and the indexes combine the
+# base index with a small one over the delta, so the cost follows the size of the delta.
+class LayeredDataset:
+    def __init__(self, base, delta, meta):
+        self.base = base
+        self.offset = len(base)
+        self.sequence = meta['sequence']
+        self.version = f"{base.version}.{self.sequence}"
+
+        columns = list(base.take([]).columns)
+        updates = delta[UPDATE_COLUMN].to_numpy()
+        self.delta = apply_schema(delta.reindex(columns=columns))
+
+        # Base rows replaced by a delta row are masked out everywhere
+        base_keys = base.row_keys
+        delta_keys = key_hashes(self.delta, UPSERT_KEYS)
+        self.live = ~np.isin(base_keys, delta_keys)
+        removed_ids = np.flatnonzero(~self.live)
+        removed = base.take(removed_ids)
+
+        # Which update touched each genre/artist, for view_version()
+        replaced_by = pd.Series(updates, index=delta_keys)
+        replaced_by = replaced_by[~replaced_by.index.duplicated(keep='last')]
+        self.changes = {}
+        self.record(self.delta, updates)
+        self.record(removed, replaced_by.reindex(base_keys[removed_ids]).to_numpy())
+        for change in meta['changes']:
+            for name in change['genres'] + change['artists']:
+                self.changes[name] = max(self.changes.get(name, 0), change['sequence'])
+
+        change = track_sums_change(removed, self.delta)
+        self.sums = update_track_sums(base.sums, change, base.sums_keys)
+        self.genre_cube, self.artist_cube, self.track_cube = update_cubes(
+            base.genre_cube, base.artist_cube, base.track_cube, base.sums, self.sums, change)
+
+        self.feature_stats = base.feature_stats.combine(FeatureStats.from_frame(removed), -1).combine(
+            FeatureStats.from_frame(self.delta))
+
+        self.search_index = LayeredSearchIndex(base.search_index, self.live, self.delta, self.offset)
+        self.artist_index = LayeredArtistIndex(base.artist_index, self.live, self.delta, self.offset, self.take,
+                                               removed['Artist Cleaned'])
+        # Artists that gained or lost rows are re-ranked from their current rows
+        artists = set(removed['Artist Cleaned'].dropna().astype(str)) | set(self.delta['Artist Cleaned'].dropna().astype(str))
+        row_ids = [self.artist_index.row_ids(artist) for artist in artists] + [np.array([], dtype=np.int64)]
+        self.top_items = LayeredTopItems(base.top_items, self.take(np.concatenate(row_ids)), artists)
+        self.feature_index = LayeredFeatureIndex(base.feature_index, self.live, self.delta, self.offset)
+        self.similar_index = LayeredNeighbors(base.similar_index, self.live, self.delta, self.offset)
+
+    def record(self, rows, updates):
+        for column in ('Genre', 'Artist Cleaned'):
+            latest = pd.Series(updates).groupby(rows[column].astype(object).to_numpy()).max()
+            for name, sequence in latest.items():
+                self.changes[name] = max(self.changes.get(name, 0), int(sequence))
+
+    def __len__(self):
+        return self.offset + len(self.delta)
+
+    # Rows at the given positions, in the order requested; positions past the base are delta rows
+    def take(self, row_ids, columns=None):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        in_base = row_ids < self.offset
+        delta = self.delta if columns is None else self.delta[columns]
+        parts = [self.base.take(row_ids[in_base], columns), delta.iloc[row_ids[~in_base] - self.offset]]
+        rows = pd.concat(parts, ignore_index=True)
+        # Back from base-then-delta order to the requested order
+        positions = np.r_[np.flatnonzero(in_base), np.flatnonzero(~in_base)]
+        return apply_schema(rows.iloc[np.argsort(positions, kind='stable')].reset_index(drop=True))
+
+    # Version of the data behind a view: the last update that touched any of the given
+    # genres/artists, so cached views of untouched genres and artists stay valid
+    def view_version(self, genres=None, artists=None):
+        if genres is None and artists is None:
+            return self.version
+        names = list(genres or []) + list(artists or [])
+        return f"{self.base.version}.{max((self.changes.get(name, 0) for name in names), default=0)}"
+
+
+# The dataset with any upserted rows layered over it
+def with_updates(dataset, path, cache_dir=None):
+    delta, meta = read_delta(path, cache_dir)
+    if delta is None or meta['base_version'] != dataset.version or len(delta) == 0:
+        return dataset
+    return LayeredDataset(dataset, delta, meta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append or replace rows of the music dataset without rebuilding it")
+    parser.add_argument('source', help="the dataset CSV the app loads (MUSIC_DATA_PATH)")
+    parser.add_argument('updates', help="CSV with new or changed rows, matched on " + '/'.join(UPSERT_KEYS))
+    args = parser.parse_args()
+
+    rows = pd.read_csv(args.updates, encoding=CSV_ENCODING)
+    sequence = upsert_rows(args.source, rows)
+    print(f"Applied update {sequence}: {len(rows):,} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,131 +1,206 @@
+import os
 import streamlit as st
 import sqlite3
-import hashlib
 import pandas as pd
+from user_db import DB_PATH, UserDatabase
+from user_hash import PasswordHasher
+from user_directory import (DIRECTORY_COLUMNS, DIRECTORY_FIELDS, EXPORT_FORMATS, HAS_OPENPYXL, count_users,
+                            export_users, new_export_path, read_export, user_page)
 
-# Function to hash passwords and security answers
-def hash_text(text):
-    return hashlib.sha256(str.encode(text)).hexdigest()
+# Users listed per page of the moderator's user directory
+DIRECTORY_PAGE_SIZE = 50
 
-def create_users_table():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    
-    # Create the table with the correct schema
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT,
-            last_name TEXT,
-            username TEXT UNIQUE,
-            email TEXT UNIQUE,
-            role TEXT,
-            password TEXT,
-            security_question_1 TEXT,
-            security_answer_1 TEXT,
-            security_question_2 TEXT,
-            security_answer_2 TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+# Salted password and security answer hashing on a bounded worker pool, one per process
+@st.cache_resource
+def password_hasher():
+    return PasswordHasher()
+
+# One connection pool per process; the schema is created and migrated on first use
+# instead of on every rerun
+@st.cache_resource
+def user_database():
+    return UserDatabase(DB_PATH).migrate()
 
 # Function to add a new user to the database
 def add_user(first_name, last_name, username, email, role, password, 
              security_question_1, security_answer_1, 
              security_question_2, security_answer_2):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
+    hashed_password, hashed_answer_1, hashed_answer_2 = password_hasher().hash_many(
+        [password, security_answer_1, security_answer_2])
+    user_database().execute('''
         INSERT INTO users (first_name, last_name, username, email, role, password, 
         security_question_1, security_answer_1, security_question_2, security_answer_2)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (first_name, last_name, username, email, role, hash_text(password), 
-          security_question_1, hash_text(security_answer_1),
-          security_question_2, hash_text(security_answer_2)))
-    conn.commit()
-    conn.close()
+    ''', (first_name, last_name, username, email, role, hashed_password, 
+          security_question_1, hashed_answer_1,
+          security_question_2, hashed_answer_2))
 
-# Function to check login and retrieve user details
+# Function to check login and retrieve user details. Legacy SHA-256 and outdated
+# hashes are replaced with the current hasher's on a successful login.
 def login_user(username, password):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT first_name, last_name, username, role FROM users WHERE username = ? AND password = ?', 
-              (username, hash_text(password)))
-    user = c.fetchone()
-    conn.close()
-    return user
+    row = user_database().fetch_one(
+        'SELECT id, first_name, last_name, username, role, password FROM users WHERE username = ?', (username,))
+    matches, upgraded = password_hasher().check(password, row[5] if row else None)
+    if not matches:
+        return None
+    if upgraded:
+        # Skipped if the password changed meanwhile
+        user_database().execute('UPDATE users SET password = ? WHERE id = ? AND password = ?',
+                                (upgraded, row[0], row[5]))
+    return row[1:5]
 
 # Function to check if email exists
 def email_exists(email):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT email FROM users WHERE email = ?', (email,))
-    exists = c.fetchone() is not None
-    conn.close()
-    return exists
-
-# Function to verify security answers
+    return user_database().fetch_one('SELECT email FROM users WHERE email = ?', (email,)) is not None
+
+# Function to get the security questions of an account
+def security_questions(email):
+    return user_database().fetch_one('SELECT security_question_1, security_question_2 FROM users WHERE email = ?',
+                                     (email,))
+
+# Function to verify security answers (upgrading their hashes like login_user)
 def verify_security_answers(email, answer_1, answer_2):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT security_answer_1, security_answer_2 FROM users WHERE email = ?', (email,))
-    row = c.fetchone()
-    conn.close()
+    row = user_database().fetch_one('SELECT id, security_answer_1, security_answer_2 FROM users WHERE email = ?',
+                                    (email,))
     if row:
-        hashed_answer_1, hashed_answer_2 = row
-        return hash_text(answer_1.lower()) == hashed_answer_1 and hash_text(answer_2.lower()) == hashed_answer_2
+        user_id, hashed_answer_1, hashed_answer_2 = row
+        (matches_1, upgraded_1), (matches_2, upgraded_2) = password_hasher().check_many(
+            [(answer_1.lower(), hashed_answer_1), (answer_2.lower(), hashed_answer_2)])
+        if not (matches_1 and matches_2):
+            return False
+        if upgraded_1 or upgraded_2:
+            user_database().execute('''
+                UPDATE users SET security_answer_1 = ?, security_answer_2 = ?
+                WHERE id = ? AND security_answer_1 = ? AND security_answer_2 = ?
+            ''', (upgraded_1 or hashed_answer_1, upgraded_2 or hashed_answer_2, user_id, hashed_answer_1,
+                  hashed_answer_2))
+        return True
     return False
 
 # Function to update password
 def update_password(email, new_password):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('UPDATE users SET password = ? WHERE email = ?', 
-              (hash_text(new_password), email))
-    conn.commit()
-    conn.close()
-
-
-# Function to view all users (moderator-only access)
-def view_all_users():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT first_name, last_name, username, email, role, password FROM users')
-    users = c.fetchall()
-    conn.close()
-    return users
+    user_database().execute('UPDATE users SET password = ? WHERE email = ?', 
+                            (password_hasher().hash(new_password), email))
+
 
 # Function to display users in a table format (for moderators)
 def display_users():
     st.subheader("Registered Users")
-    users = view_all_users()
+
+    # Health of the email outbox (verification codes)
+    outbox = mail_outbox()
+    stats = outbox.stats()
+    latency = (f"; sent within {stats['latency_p50_s']:.1f} s (p50), {stats['latency_p95_s']:.1f} s (p95)"
+               if stats['sent'] else "")
+    st.caption(f"Email outbox: {stats['queued']:,} queued, {stats['failed']:,} failed{latency}")
+    if outbox.worker is None:
+        st.warning("Email is not configured: set USER_SMTP_USER and USER_SMTP_PASSWORD to send verification codes.")
+
+    db = user_database()
+
+    # Prefix search and sort on the indexed username, email and role
+    col1, col2 = st.columns(2)
+    search_field = col1.selectbox("Search by", DIRECTORY_FIELDS, key='directory_search_field')
+    prefix = col2.text_input("Starts with", key='directory_prefix')
+    col3, col4 = st.columns(2)
+    sort_field = col3.selectbox("Sort by", DIRECTORY_FIELDS, key='directory_sort_field')
+    order = col4.radio("Order", ["Ascending", "Descending"], horizontal=True, key='directory_order')
+    descending = order == "Descending"
+
+    # Cursors of the pages visited so far, reset when the search or order changes
+    view = (search_field, prefix, sort_field, descending)
+    if st.session_state.get('directory_view') != view:
+        st.session_state['directory_view'] = view
+        st.session_state['directory_cursors'] = [None]
+    cursors = st.session_state['directory_cursors']
+
+    total = count_users(db, search_field, prefix)
+    users, next_cursor = user_page(db, sort_field, descending, cursors[-1], DIRECTORY_PAGE_SIZE, search_field,
+                                   prefix)
 
     if users:
-        # Convert the fetched data to a pandas DataFrame for better handling
-        df = pd.DataFrame(users, columns=['First Name', 'Last Name', 'Username', 'Email', 'Role', 'Password'])
-        df.index = df.index + 1  # Adjust the index to start from 1
+        # Convert the fetched page to a pandas DataFrame for better handling
+        first = (len(cursors) - 1) * DIRECTORY_PAGE_SIZE + 1
+        df = pd.DataFrame(users, columns=list(DIRECTORY_COLUMNS.values()))
+        df.index = df.index + first  # Number the rows across pages
         st.table(df)  # This will display the data with headers
+        st.caption(f"Showing users {first:,}-{first + len(df) - 1:,} of {total:,}")
 
-        # Convert user data to CSV
-        csv = df.to_csv(index=False).encode('utf-8')
+        col1, col2 = st.columns(2)
+        col1.button("Previous page", on_click=cursors.pop, disabled=len(cursors) == 1, key='directory_previous')
+        col2.button("Next page", on_click=cursors.append, args=(next_cursor,), disabled=next_cursor is None,
+                    key='directory_next')
 
-        # Add a button to download the user database as a CSV file
-        st.download_button(
-            label="Download Table",
-            data=csv,
-            file_name='user_database.csv',
-            mime='text/csv'
-        )
+        export_user_table(db, view, total)
+    elif prefix:
+        st.info("No users match the search.")
     else:
         st.info("No users registered yet.")
 
+# Export of every user matching the search, in the chosen order, written from the
+# database cursor in chunks and read from disk when the download is clicked
+def export_user_table(db, view, total):
+    search_field, prefix, sort_field, descending = view
+
+    formats = [fmt for fmt in EXPORT_FORMATS if fmt != 'XLSX' or HAS_OPENPYXL]
+    fmt = st.radio("Download format", formats, horizontal=True, key='directory_export_format')
+    extension, mime = EXPORT_FORMATS[fmt]
+
+    if st.button("Prepare download", key='directory_export_prepare'):
+        bar = st.progress(0.0, text="Exporting...")
+        path = new_export_path(extension)
+        rows = export_users(db, path, fmt, sort_field, descending, search_field, prefix,
+                            progress=lambda done: bar.progress(min(done / max(total, 1), 1.0),
+                                                               text=f"Exported {done:,} of {total:,} users"))
+        st.session_state['directory_export'] = (view, fmt, path, rows)
+
+    prepared = st.session_state.get('directory_export')
+    if prepared and prepared[:2] == (view, fmt) and os.path.exists(prepared[2]):
+        path, rows = prepared[2:]
+        # Add a button to download the user database
+        st.download_button(
+            label=f"Download Table ({rows:,} users)",
+            data=lambda: read_export(path),
+            file_name=f'user_database.{extension}',
+            mime=mime,
+            key='directory_export_download'
+        )
+
+# Bulk registration from a CSV or Excel file (for moderators): every row is validated,
+# the valid ones are hashed in parallel and inserted in chunked transactions, and the
+# rows that were skipped are listed with the reason
+def import_users_page():
+    from user_import import IMPORT_COLUMNS, IMPORTED, import_users, read_users_file
+
+    st.subheader("Import Users")
+    st.caption(f"One user per row, with the columns: {', '.join(IMPORT_COLUMNS)}")
+    uploaded_file = st.file_uploader("Select a CSV or Excel file:", type=["csv", "xlsx"] if HAS_OPENPYXL else ["csv"])
+
+    if st.button("Import Users") and uploaded_file is not None:
+        try:
+            df = read_users_file(uploaded_file, uploaded_file.name)
+        except ValueError as e:
+            st.error(str(e))
+            return
+
+        bar = st.progress(0.0, text="Importing...")
+        report = import_users(user_database(), df,
+                              progress=lambda done, total: bar.progress(done / total,
+                                                                        text=f"Imported {done:,} of {total:,} users"))
+        skipped = report[report['status'] != IMPORTED]
+        st.success(f"Imported {len(report) - len(skipped):,} of {len(report):,} users.")
+        if len(skipped):
+            st.warning(f"{len(skipped):,} rows were skipped:")
+            st.dataframe(skipped, hide_index=True, use_container_width=True)
+            st.download_button("Download skipped rows", data=skipped.to_csv(index=False).encode('utf-8'),
+                               file_name='skipped_users.csv', mime='text/csv')
+
 def application_page():
     st.title("Application Page")
 
     functions = ["File Extraction", "Image Recognition", "Table Converter", "Car Plate Recognition", "RegEx Generator", "Song Recognition"]
     if st.session_state['role'] == "moderator":
-        functions.append("User Database")
+        functions.extend(["User Database", "User Import"])
 
     # Unique key for function selectbox
     selected_function = st.selectbox("Select Function", functions, key="function_select")
@@ -169,6 +244,8 @@ def application_page():
         song()
     elif selected_function == "User Database":
         display_users()
+    elif selected_function == "User Import":
+        import_users_page()
 
 
     # Ensure the sign-out button has a unique key
@@ -244,18 +321,23 @@ def registration_page():
                 
     return_to_home_button()
 
-import smtplib
 import random
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
-# Function to send the verification code via email
+# Outgoing mail is queued in the user database and sent by one background worker per
+# process over a reused SMTP connection, so pages never wait for the mail server
+@st.cache_resource
+def mail_outbox():
+    from user_mail import Outbox, OutboxWorker
+    outbox = Outbox(user_database())
+    try:
+        OutboxWorker(outbox).start()
+    except ValueError as e:
+        # No SMTP account configured: the outbox can still be read, but nothing is sent
+        print(f"Email disabled: {e}")
+    return outbox
+
+# Function to send the verification code via email (queued; sent within seconds)
 def send_verification_email(to_email, verification_code):
-    smtp_server = 'smtp.gmail.com'
-    smtp_port = 587
-    smtp_user = 'xavcdq@gmail.com'
-    smtp_password = 'szii aqas oiue jrxh'
-    
     subject = 'Password Reset Verification Code'
     body = f'''
     Dear User,
@@ -270,20 +352,15 @@ def send_verification_email(to_email, verification_code):
     Your Team
     '''
 
-    msg = MIMEMultipart()
-    msg['From'] = smtp_user
-    msg['To'] = to_email
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-
+    outbox = mail_outbox()
+    if outbox.worker is None:
+        print("Error queueing email: no SMTP account configured (see user_mail.py)")
+        return False
     try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
+        outbox.enqueue(to_email, subject, body)
         return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
+    except sqlite3.Error as e:
+        print(f"Error queueing email: {e}")
         return False
 
 def return_to_home_button():
@@ -310,11 +387,7 @@ def forgot_password_page():
                 st.session_state.email = email
                 st.success("Email found. Please answer the security questions.")
                 
-                conn = sqlite3.connect('users.db')
-                c = conn.cursor()
-                c.execute('SELECT security_question_1, security_question_2 FROM users WHERE email = ?', (email,))
-                questions = c.fetchone()
-                conn.close()
+                questions = security_questions(email)
 
                 if questions:
                     st.session_state.security_questions = questions
@@ -416,8 +489,6 @@ def home_page():
         st.query_params.update({'page': 'forgot_password'})
 
 def main():
-    create_users_table()
-
     if 'page' not in st.session_state:
         st.session_state['page'] = 'home'
 
@@ -0,0 +1,159 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Set USER_DB_PATH to keep the accounts somewhere else
+DB_PATH = os.environ.get('USER_DB_PATH', 'users.db')
+# How long a statement waits for another connection's write lock before failing
+BUSY_TIMEOUT_MS = 5_000
+# Open connections kept per process; sessions beyond this wait for a free one
+POOL_SIZE = 8
+# Prepared statements kept per connection (sqlite3 reuses them by SQL text)
+STATEMENT_CACHE = 256
+
+# Schema changes (one statement each), applied in order once per database. PRAGMA
+# user_version records how many have run, so each one only ever runs once. Never edit a released migration;
+# append a new one instead.
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS users(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT,
+        last_name TEXT,
+        username TEXT UNIQUE,
+        email TEXT UNIQUE,
+        role TEXT,
+        password TEXT,
+        security_question_1 TEXT,
+        security_answer_1 TEXT,
+        security_question_2 TEXT,
+        security_answer_2 TEXT
+    )
+    ''',
+    # Outgoing mail, see user_mail.Outbox
+    '''
+    CREATE TABLE IF NOT EXISTS outbox(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        to_email TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        next_attempt REAL NOT NULL,
+        created REAL NOT NULL,
+        sent REAL,
+        last_error TEXT
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt)',
+    # Case-insensitive search and keyset pages of the user directory, see user_directory
+    'CREATE INDEX IF NOT EXISTS users_username_nocase ON users(username COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS users_email_nocase ON users(email COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS users_role_nocase ON users(role COLLATE NOCASE)',
+]
+
+
+# A process-wide pool of connections to the user database. Connections are opened
+# once and reused by every session and rerun, so a login costs a statement, not a
+# connect plus schema check. The database runs in WAL mode: readers never block the
+# writer or each other, and a waiting writer retries for BUSY_TIMEOUT_MS instead of
+# failing with "database is locked".
+class UserDatabase:
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Autocommit mode: transactions are opened explicitly by write()
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        # Safe with WAL: a power loss can only drop the last commits, never corrupt
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    # A pooled connection for the duration of the block
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._opened < self.pool_size
+                if create:
+                    self._opened += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    # Run one read statement and return all its rows
+    def fetch_all(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def fetch_one(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    # A write transaction. BEGIN IMMEDIATE takes the write lock up front, so a
+    # transaction that reads before it writes can't fail halfway on a lock upgrade.
+    @contextmanager
+    def write(self):
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    # Run one write statement in its own transaction; returns the number of rows changed
+    def execute(self, sql, params=()):
+        with self.write() as conn:
+            return conn.execute(sql, params).rowcount
+
+    # Switch to WAL and apply the migrations this database hasn't seen yet
+    def migrate(self):
+        with self.connection() as conn:
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                    conn.execute(migration)
+                    conn.execute(f'PRAGMA user_version = {number}')
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        return self
+
+    # Close the pooled connections, once no session is using the database
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
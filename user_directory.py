@@ -0,0 +1,163 @@
+import csv
+import os
+import time
+import tempfile
+
+# Fields the directory can be searched and sorted by. Keys compare case-insensitively
+# and every one has a NOCASE index (user_db migrations), so a prefix search is an
+# index range scan and every page is an index seek.
+DIRECTORY_FIELDS = ['username', 'email', 'role']
+# Columns listed and exported, with their headings
+DIRECTORY_COLUMNS = {
+    'first_name': 'First Name',
+    'last_name': 'Last Name',
+    'username': 'Username',
+    'email': 'Email',
+    'role': 'Role',
+}
+# Rows fetched from the cursor and written per step of an export
+EXPORT_CHUNK_ROWS = 5_000
+# Offered export formats: file extension and MIME type (XLSX needs openpyxl)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+# Exports are written here and served from disk; files older than EXPORT_MAX_AGE are
+# removed when a new export is started
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'user_exports')
+EXPORT_MAX_AGE = 24 * 3600
+
+try:
+    import openpyxl  # noqa: F401
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+
+def check_field(field):
+    if field not in DIRECTORY_FIELDS:
+        raise ValueError(f"Unknown directory field {field!r}; expected one of {', '.join(DIRECTORY_FIELDS)}")
+
+
+# WHERE clause and parameters for a case-insensitive prefix search. A range on the
+# NOCASE key rather than LIKE, so SQLite can use the index whatever the column collation.
+def search_clause(field, prefix):
+    if not prefix:
+        return '1', []
+    check_field(field)
+    # NOCASE folds ASCII letters to lower case, so the bounds are compared folded too
+    prefix = ''.join(c.lower() if 'A' <= c <= 'Z' else c for c in prefix)
+    # The first string after every string that starts with the prefix, in folded order:
+    # upper case letters fold away, so the character after '@' is '['
+    successor = chr(ord(prefix[-1]) + 1)
+    upper = prefix[:-1] + ('[' if 'A' <= successor <= 'Z' else successor)
+    return f'{field} COLLATE NOCASE >= ? AND {field} COLLATE NOCASE < ?', [prefix, upper]
+
+
+# The rows after a keyset cursor (the sort key and id of the last row shown), in
+# (key, id) order, as a list of WHERE clauses and parameters to read one after the
+# other. Each is a range on the key plus a tie-break on id, which SQLite turns into an
+# index seek; a (key, id) row value, or an OR with the NULL keys, would scan instead.
+# NULL keys sort first ascending and last descending, so they get a clause of their own.
+def after_clauses(field, cursor, descending):
+    if cursor is None:
+        return [('1', [])]
+    key, row_id = cursor
+    column = f'{field} COLLATE NOCASE'
+    if not descending:
+        if key is None:
+            return [(f'{field} IS NULL AND id > ?', [row_id]), (f'{field} IS NOT NULL', [])]
+        return [(f'{column} >= ? AND ({column} > ? OR id > ?)', [key, key, row_id])]
+    if key is None:
+        return [(f'{field} IS NULL AND id < ?', [row_id])]
+    return [(f'{column} <= ? AND ({column} < ? OR id < ?)', [key, key, row_id]), (f'{field} IS NULL', [])]
+
+
+def order_clause(field, descending):
+    direction = 'DESC' if descending else 'ASC'
+    return f'{field} COLLATE NOCASE {direction}, id {direction}'
+
+
+# Number of users matching a prefix search
+def count_users(db, search_field='username', prefix=''):
+    where, params = search_clause(search_field, prefix)
+    return db.fetch_one(f'SELECT COUNT(*) FROM users WHERE {where}', params)[0]
+
+
+# One page of users after a cursor: (rows, cursor of the next page or None). Pages are
+# found by seeking the sort index past the cursor, so page 1,000 costs what page 1 does
+# (OFFSET would scan every row before it).
+def user_page(db, sort_field='username', descending=False, cursor=None, page_size=50, search_field='username',
+              prefix=''):
+    check_field(sort_field)
+    where, params = search_clause(search_field, prefix)
+    rows = []
+    for after, after_params in after_clauses(sort_field, cursor, descending):
+        rows += db.fetch_all(f'''
+            SELECT id, {sort_field}, {', '.join(DIRECTORY_COLUMNS)} FROM users
+            WHERE {where} AND {after} ORDER BY {order_clause(sort_field, descending)} LIMIT ?
+        ''', params + after_params + [page_size + 1 - len(rows)])
+        if len(rows) > page_size:
+            break
+    next_cursor = (rows[page_size - 1][1], rows[page_size - 1][0]) if len(rows) > page_size else None
+    return [row[2:] for row in rows[:page_size]], next_cursor
+
+
+# Path for a new export file; exports left over from earlier sessions are removed
+def new_export_path(extension, export_dir=EXPORT_DIR):
+    os.makedirs(export_dir, exist_ok=True)
+    cutoff = time.time() - EXPORT_MAX_AGE
+    for name in os.listdir(export_dir):
+        old = os.path.join(export_dir, name)
+        try:
+            if os.path.getmtime(old) < cutoff:
+                os.remove(old)
+        except OSError:
+            pass
+    handle, path = tempfile.mkstemp(suffix=f'.{extension}', dir=export_dir)
+    os.close(handle)
+    return path
+
+
+def read_export(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# Write every matching user, in the chosen order, to path as CSV or XLSX straight from
+# one SQLite cursor, EXPORT_CHUNK_ROWS rows at a time: memory stays at one chunk however
+# many accounts there are. progress(done) is called after every chunk.
+def export_users(db, path, fmt='CSV', sort_field='username', descending=False, search_field='username', prefix='',
+                 progress=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    check_field(sort_field)
+    where, params = search_clause(search_field, prefix)
+    header = list(DIRECTORY_COLUMNS.values())
+    done = 0
+    with db.connection() as conn:
+        cursor = conn.execute(f'''
+            SELECT {', '.join(DIRECTORY_COLUMNS)} FROM users WHERE {where}
+            ORDER BY {order_clause(sort_field, descending)}
+        ''', params)
+        if fmt == 'CSV':
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                while rows := cursor.fetchmany(chunk_rows):
+                    writer.writerows(rows)
+                    done += len(rows)
+                    if progress is not None:
+                        progress(done)
+        else:
+            from openpyxl import Workbook
+            # Write-only workbooks stream rows to disk instead of keeping every cell
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet('Users')
+            sheet.append(header)
+            while rows := cursor.fetchmany(chunk_rows):
+                for row in rows:
+                    sheet.append(row)
+                done += len(rows)
+                if progress is not None:
+                    progress(done)
+            workbook.save(path)
+    return done
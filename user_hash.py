@@ -0,0 +1,131 @@
+import os
+import hmac
+import base64
+import hashlib
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+# Hasher for new passwords and security answers, as "<algorithm>:<param>=<value>,...".
+# Set USER_PASSWORD_HASHER to change it (python bench_user.py compares settings);
+# stored hashes made with other settings are upgraded on the next successful login.
+DEFAULT_HASHER = os.environ.get('USER_PASSWORD_HASHER', 'scrypt:n=16384,r=8,p=1')
+# Hashes computed at once; more logins queue instead of oversubscribing the CPU
+HASH_WORKERS = int(os.environ.get('USER_HASH_WORKERS', os.cpu_count() or 1))
+# Random salt per hash
+SALT_BYTES = 16
+
+
+def b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+# Stored hashes are "<algorithm>$<params>$<salt>$<hash>", so every row keeps the
+# parameters it was made with and settings can change without breaking old rows
+class ScryptHasher:
+    algorithm = 'scrypt'
+
+    def __init__(self, n=16384, r=8, p=1):
+        self.n, self.r, self.p = int(n), int(r), int(p)
+
+    @property
+    def params(self):
+        return f"n={self.n},r={self.r},p={self.p}"
+
+    def derive(self, text, salt):
+        # scrypt needs 128 * r * (n + p + 2) bytes; leave room above OpenSSL's 32 MB default
+        return hashlib.scrypt(text.encode(), salt=salt, n=self.n, r=self.r, p=self.p, dklen=32,
+                              maxmem=128 * self.r * (self.n + self.p + 2) + 2 ** 20)
+
+
+class PBKDF2Hasher:
+    algorithm = 'pbkdf2_sha256'
+
+    def __init__(self, iterations=600_000):
+        self.iterations = int(iterations)
+
+    @property
+    def params(self):
+        return f"iterations={self.iterations}"
+
+    def derive(self, text, salt):
+        return hashlib.pbkdf2_hmac('sha256', text.encode(), salt, self.iterations)
+
+
+HASHERS = {hasher.algorithm: hasher for hasher in (ScryptHasher, PBKDF2Hasher)}
+
+
+# Hasher from "<algorithm>:<param>=<value>,..." (or the params part of a stored hash)
+def make_hasher(spec):
+    algorithm, _, params = spec.partition(':')
+    if algorithm not in HASHERS:
+        raise ValueError(f"Unknown password hasher {algorithm!r}; expected one of {', '.join(HASHERS)}")
+    return HASHERS[algorithm](**dict(param.split('=') for param in params.split(',') if param))
+
+
+def encode(hasher, text, salt=None):
+    salt = secrets.token_bytes(SALT_BYTES) if salt is None else salt
+    return f"{hasher.algorithm}${hasher.params}${b64(salt)}${b64(hasher.derive(text, salt))}"
+
+
+# Rows written before salted hashes hold a bare hex SHA-256
+def is_legacy(encoded):
+    return '$' not in encoded
+
+
+def verify(text, encoded):
+    if is_legacy(encoded):
+        return hmac.compare_digest(hashlib.sha256(text.encode()).hexdigest(), encoded)
+    algorithm, params, salt, digest = encoded.split('$')
+    hasher = make_hasher(f"{algorithm}:{params}")
+    return hmac.compare_digest(hasher.derive(text, unb64(salt)), unb64(digest))
+
+
+# Password and security answer hashing on a bounded thread pool. hashlib's scrypt and
+# PBKDF2 release the GIL, so HASH_WORKERS hashes run in parallel while the Streamlit
+# script threads only wait for their result.
+class PasswordHasher:
+    def __init__(self, spec=DEFAULT_HASHER, workers=HASH_WORKERS):
+        self.hasher = make_hasher(spec)
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    # Whether a stored hash was made by anything but the current settings
+    def needs_rehash(self, encoded):
+        return is_legacy(encoded) or not encoded.startswith(f"{self.hasher.algorithm}${self.hasher.params}$")
+
+    def hash(self, text):
+        return self._pool.submit(encode, self.hasher, text).result()
+
+    # Several texts hashed in parallel (a registration hashes three, an import thousands),
+    # split into one batch per worker so large lists don't pay a task per text
+    def hash_many(self, texts):
+        texts = list(texts)
+        size = -(-len(texts) // self.workers) or 1
+        batches = [texts[start:start + size] for start in range(0, len(texts), size)]
+        return [hashed for batch in self._pool.map(lambda batch: [encode(self.hasher, text) for text in batch], batches)
+                for hashed in batch]
+
+    # (matches, upgraded hash or None). A match on a legacy or outdated hash comes back
+    # with a new hash to store. A missing account (encoded None) still costs one hash,
+    # so response times don't tell which usernames exist.
+    def check(self, text, encoded):
+        return self._pool.submit(self._check, text, encoded).result()
+
+    def _check(self, text, encoded):
+        if encoded is None:
+            encode(self.hasher, text)
+            return False, None
+        if not verify(text, encoded):
+            return False, None
+        return True, (encode(self.hasher, text) if self.needs_rehash(encoded) else None)
+
+    # check() for several (text, stored hash) pairs in parallel
+    def check_many(self, pairs):
+        return list(self._pool.map(lambda pair: self._check(*pair), pairs))
+
+    def close(self):
+        self._pool.shutdown()
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from user_hash import DEFAULT_HASHER, HASH_WORKERS, PasswordHasher
+
+# Columns an import file must have (headings are matched ignoring case, spaces and
+# underscores, so "First Name" and "first_name" both work)
+IMPORT_COLUMNS = ['first_name', 'last_name', 'username', 'email', 'role', 'password',
+                  'security_question_1', 'security_answer_1', 'security_question_2', 'security_answer_2']
+ROLES = ['user', 'moderator']
+EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+# Rows hashed and inserted per transaction
+IMPORT_CHUNK_ROWS = 1_000
+# Hasher for imported credentials. Hashing dominates a large import (three hashes per
+# user), so it can be set cheaper than USER_PASSWORD_HASHER: login_user and
+# verify_security_answers upgrade those hashes to the regular setting on first use.
+IMPORT_HASHER = os.environ.get('USER_IMPORT_HASHER', DEFAULT_HASHER)
+
+# Outcome of each row in the import report
+IMPORTED = 'imported'
+
+
+def column_key(name):
+    return str(name).strip().lower().replace(' ', '_')
+
+
+# The uploaded CSV or XLSX as text columns named as in IMPORT_COLUMNS
+def read_users_file(file, name):
+    if name.lower().endswith('.xlsx'):
+        df = pd.read_excel(file, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_csv(file, dtype=str, keep_default_na=False)
+    df.columns = [column_key(column) for column in df.columns]
+    missing = [column for column in IMPORT_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return df[IMPORT_COLUMNS].fillna('').apply(lambda column: column.str.strip())
+
+
+# First problem found with every row, or None; each check runs on whole columns
+def validate_users(df):
+    errors = pd.Series(None, index=df.index, dtype=object)
+
+    def flag(mask, message):
+        errors[mask & errors.isna()] = message
+
+    empty = df.eq('')
+    missing = empty.dot(pd.Series([f"{column}, " for column in df.columns], index=df.columns)).str.rstrip(', ')
+    flag(empty.any(axis=1), 'missing ' + missing)
+    flag(~df['role'].str.lower().isin(ROLES), f"role must be one of {', '.join(ROLES)}")
+    flag(~df['email'].str.fullmatch(EMAIL_PATTERN), 'invalid email')
+    flag(df['security_question_1'] == df['security_question_2'], 'security questions must differ')
+    # UNIQUE compares exactly, so do the duplicate checks
+    flag(df['username'].duplicated(), 'duplicate username in file')
+    flag(df['email'].duplicated(), 'duplicate email in file')
+    return errors
+
+
+# Values of `column` among `values` that are already taken, looked up in batches
+# within SQLite's parameter limit
+def existing_values(db, column, values, batch=500):
+    found = set()
+    values = list(values)
+    for start in range(0, len(values), batch):
+        part = values[start:start + batch]
+        found.update(row[0] for row in db.fetch_all(
+            f"SELECT {column} FROM users WHERE {column} IN ({', '.join('?' * len(part))})", part))
+    return found
+
+
+# Insert one chunk in one transaction. If another session took a username or email
+# meanwhile, the chunk is redone row by row to tell which rows conflict.
+def insert_chunk(db, rows):
+    sql = f"INSERT INTO users ({', '.join(IMPORT_COLUMNS)}) VALUES ({', '.join('?' * len(IMPORT_COLUMNS))})"
+    try:
+        with db.write() as conn:
+            conn.executemany(sql, rows)
+        return [None] * len(rows)
+    except sqlite3.IntegrityError:
+        pass
+    outcomes = []
+    with db.write() as conn:
+        for row in rows:
+            try:
+                conn.execute(sql, row)
+                outcomes.append(None)
+            except sqlite3.IntegrityError as e:
+                outcomes.append('username or email already exists' if 'UNIQUE' in str(e) else str(e))
+    return outcomes
+
+
+# Validate and insert every row of df (as from read_users_file). Returns one report row
+# per input row: its line in the file, username, email and status ('imported' or why
+# not). progress(done, total) is called after every chunk.
+def import_users(db, df, hasher_spec=IMPORT_HASHER, workers=HASH_WORKERS, chunk_rows=IMPORT_CHUNK_ROWS,
+                 progress=None):
+    df = df.reset_index(drop=True)
+    df['role'] = df['role'].str.lower()
+    errors = validate_users(df)
+
+    # Conflicts with existing accounts
+    valid = errors.isna()
+    for column in ('username', 'email'):
+        taken = existing_values(db, column, df.loc[valid, column])
+        errors[valid & df[column].isin(taken)] = f"{column} already exists"
+
+    todo = df[errors.isna()]
+    hasher = PasswordHasher(hasher_spec, workers)
+    try:
+        for start in range(0, len(todo), chunk_rows):
+            chunk = todo.iloc[start:start + chunk_rows].copy()
+            # All three credentials of the whole chunk hashed in parallel
+            credentials = ['password', 'security_answer_1', 'security_answer_2']
+            hashes = hasher.hash_many(chunk[credentials].to_numpy(dtype=object).ravel().tolist())
+            chunk[credentials] = pd.DataFrame([hashes[i:i + 3] for i in range(0, len(hashes), 3)], index=chunk.index)
+            outcomes = insert_chunk(db, [tuple(row) for row in chunk.to_numpy(dtype=object).tolist()])
+            errors[chunk.index] = outcomes
+            if progress is not None:
+                progress(min(start + chunk_rows, len(todo)), len(todo))
+    finally:
+        hasher.close()
+
+    report = df[['username', 'email']].copy()
+    # Line in the file, counting the heading as line 1
+    report.insert(0, 'line', df.index + 2)
+    report['status'] = errors.fillna(IMPORTED)
+    return report
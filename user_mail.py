@@ -0,0 +1,332 @@
+import os
+import time
+import argparse
+import smtplib
+import threading
+import socketserver
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+import numpy as np
+
+from user_db import DB_PATH, UserDatabase
+
+# SMTP account the outbox sends from. There are no default credentials: mail is only
+# sent once USER_SMTP_USER and USER_SMTP_PASSWORD are set, except to a server on this
+# machine (USER_SMTP_HOST=127.0.0.1 USER_SMTP_STARTTLS=0, such as the stand-in below)
+SMTP_HOST = os.environ.get('USER_SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('USER_SMTP_PORT', 587))
+SMTP_USER = os.environ.get('USER_SMTP_USER', '')
+SMTP_PASSWORD = os.environ.get('USER_SMTP_PASSWORD', '')
+SMTP_STARTTLS = os.environ.get('USER_SMTP_STARTTLS', '1') == '1'
+LOCAL_SMTP_HOSTS = ('127.0.0.1', 'localhost', '::1')
+SMTP_TIMEOUT = 30
+
+# Messages claimed and sent over one SMTP session at a time
+BATCH_SIZE = 20
+# Attempts per message before it is marked failed, and the retry delays between them
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 600
+# The SMTP connection is closed after this long without mail
+SMTP_IDLE_SECONDS = 60
+# A claimed message not marked sent or failed within this long (its worker died) is
+# claimed again
+CLAIM_LEASE_SECONDS = 300
+# How often the worker looks for due retries when nothing new is queued
+POLL_SECONDS = 1.0
+# Sent messages the latency figures are computed from
+LATENCY_WINDOW = 500
+
+
+def build_message(sender, to_email, subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+# Outgoing mail queued in the user database (the outbox table), so pages return as soon
+# as a message is stored and queued mail survives restarts. Rows move from 'queued' to
+# 'sending' when a worker claims them, then to 'sent', or back to 'queued' with a later
+# next_attempt after a failure, until MAX_ATTEMPTS makes them 'failed'. Claims are
+# write transactions, so several server processes can drain one outbox, and a claim
+# is a lease: if its worker dies, the message is claimed again once the lease expires.
+class Outbox:
+    def __init__(self, db):
+        self.db = db
+        self.wakeup = threading.Event()
+        # The OutboxWorker sending this process's mail; None while no SMTP account is set
+        self.worker = None
+
+    def enqueue(self, to_email, subject, body):
+        now = time.time()
+        with self.db.write() as conn:
+            message_id = conn.execute('''
+                INSERT INTO outbox (to_email, subject, body, status, attempts, next_attempt, created)
+                VALUES (?, ?, ?, 'queued', 0, ?, ?)
+            ''', (to_email, subject, body, now, now)).lastrowid
+        self.wakeup.set()
+        return message_id
+
+    # Up to `limit` due messages, marked as being sent: (id, to_email, subject, body, attempts)
+    def claim(self, limit=BATCH_SIZE):
+        now = time.time()
+        with self.db.write() as conn:
+            rows = conn.execute('''
+                SELECT id, to_email, subject, body, attempts FROM outbox
+                WHERE status IN ('queued', 'sending') AND next_attempt <= ? ORDER BY next_attempt LIMIT ?
+            ''', (now, limit)).fetchall()
+            conn.executemany('''
+                UPDATE outbox SET status = 'sending', attempts = attempts + 1, next_attempt = ? WHERE id = ?
+            ''', [(now + CLAIM_LEASE_SECONDS, row[0]) for row in rows])
+        return [row[:4] + (row[4] + 1,) for row in rows]
+
+    def mark_sent(self, message_ids):
+        with self.db.write() as conn:
+            conn.executemany("UPDATE outbox SET status = 'sent', sent = ?, last_error = NULL WHERE id = ?",
+                             [(time.time(), message_id) for message_id in message_ids])
+
+    # Retry later with exponential backoff, or give up after MAX_ATTEMPTS
+    def mark_failed(self, message_id, attempts, error):
+        if attempts >= MAX_ATTEMPTS:
+            self.db.execute("UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?", (error, message_id))
+        else:
+            delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+            self.db.execute("UPDATE outbox SET status = 'queued', next_attempt = ?, last_error = ? WHERE id = ?",
+                            (time.time() + delay, error, message_id))
+
+    # Queue depth, failures and the latency from enqueue to send of recent messages
+    def stats(self):
+        counts = dict(self.db.fetch_all('SELECT status, COUNT(*) FROM outbox GROUP BY status'))
+        oldest = self.db.fetch_one("SELECT MIN(created) FROM outbox WHERE status IN ('queued', 'sending')")[0]
+        latencies = np.array([row[0] for row in self.db.fetch_all(
+            "SELECT sent - created FROM outbox WHERE status = 'sent' ORDER BY sent DESC LIMIT ?", (LATENCY_WINDOW,))])
+        return {
+            'queued': counts.get('queued', 0) + counts.get('sending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_queued_s': time.time() - oldest if oldest is not None else 0.0,
+            'latency_p50_s': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+            'latency_p95_s': float(np.percentile(latencies, 95)) if len(latencies) else float('nan'),
+        }
+
+
+# One SMTP session, opened (and authenticated) on first use and kept for later batches
+class SMTPSender:
+    def __init__(self, host=None, port=None, user=None, password=None, starttls=None, timeout=SMTP_TIMEOUT):
+        # Unset arguments come from the module settings as they are when the sender is made
+        self.host = SMTP_HOST if host is None else host
+        self.port = SMTP_PORT if port is None else port
+        self.user = SMTP_USER if user is None else user
+        self.password = SMTP_PASSWORD if password is None else password
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        if not (self.user and self.password) and self.host not in LOCAL_SMTP_HOSTS:
+            raise ValueError(f"No SMTP credentials for {self.host}: set USER_SMTP_USER and USER_SMTP_PASSWORD")
+        self.timeout = timeout
+        self.server = None
+        self.connects = 0
+
+    def connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.connects += 1
+
+    def send(self, to_email, subject, body):
+        if self.server is None:
+            self.connect()
+        self.server.send_message(build_message(self.user or 'noreply@localhost', to_email, subject, body))
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+
+# Background thread draining an outbox: claims a batch, sends it over the shared SMTP
+# session (reconnecting once if the server dropped it) and records the outcome of
+# every message. The session is closed again after SMTP_IDLE_SECONDS without mail.
+class OutboxWorker(threading.Thread):
+    def __init__(self, outbox, sender=None, batch_size=BATCH_SIZE):
+        super().__init__(name='outbox-worker', daemon=True)
+        self.outbox = outbox
+        self.sender = SMTPSender() if sender is None else sender
+        self.batch_size = batch_size
+        outbox.worker = self
+        self.stopping = threading.Event()
+
+    def run(self):
+        last_sent = time.monotonic()
+        while not self.stopping.is_set():
+            try:
+                batch = self.outbox.claim(self.batch_size)
+                if batch:
+                    self.send_batch(batch)
+                    last_sent = time.monotonic()
+                    continue
+                if self.sender.server is not None and time.monotonic() - last_sent > SMTP_IDLE_SECONDS:
+                    self.sender.close()
+            except Exception as e:
+                # e.g. a locked database: keep the worker alive and try again after a pause.
+                # Messages claimed but not marked are claimed again when their lease expires.
+                print(f"Outbox worker error: {type(e).__name__}: {e}")
+            self.outbox.wakeup.wait(POLL_SECONDS)
+            self.outbox.wakeup.clear()
+        self.sender.close()
+
+    def send_batch(self, batch):
+        sent = []
+        for position, (message_id, to_email, subject, body, attempts) in enumerate(batch):
+            try:
+                try:
+                    self.sender.send(to_email, subject, body)
+                except smtplib.SMTPServerDisconnected:
+                    self.sender.server = None
+                    self.sender.send(to_email, subject, body)
+                sent.append(message_id)
+            except smtplib.SMTPRecipientsRefused as e:
+                # This address is the problem, not the session
+                self.outbox.mark_failed(message_id, attempts, str(e))
+            except Exception as e:
+                # Session-level failure: retry the rest of the batch later on a new connection
+                self.sender.close()
+                for failed_id, _, _, _, failed_attempts in batch[position:]:
+                    self.outbox.mark_failed(failed_id, failed_attempts, f"{type(e).__name__}: {e}")
+                break
+        if sent:
+            self.outbox.mark_sent(sent)
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self.outbox.wakeup.set()
+        self.join(timeout)
+
+
+# Minimal SMTP server that accepts every message and keeps it in memory, for tests and
+# load tests. It offers AUTH PLAIN/LOGIN and accepts any credentials, but no STARTTLS.
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        self.messages = []
+        self.sessions = 0
+        self.delay = delay
+        self.lock = threading.Lock()
+        super().__init__((host, port), LocalSMTPHandler)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='local-smtp', daemon=True).start()
+        return self
+
+
+class LocalSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        with self.server.lock:
+            self.server.sessions += 1
+        self.reply('220 localhost ESMTP stand-in')
+        recipients = []
+        while True:
+            try:
+                line = self.rfile.readline()
+            except ConnectionError:
+                # A client that exits without QUIT
+                return
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif verb == 'HELO':
+                self.reply('250 localhost')
+            elif verb == 'AUTH':
+                if command.upper().startswith('AUTH LOGIN'):
+                    for prompt in ('VXNlcm5hbWU6', 'UGFzc3dvcmQ6'):
+                        self.reply(f'334 {prompt}')
+                        self.rfile.readline()
+                self.reply('235 Authentication successful')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip().strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(line[1:] if line.startswith(b'..') else line)
+                time.sleep(self.server.delay)
+                with self.server.lock:
+                    self.server.messages.append((recipients, b''.join(data)))
+                self.reply('250 OK queued')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
+
+
+# Decoded text of a message the stand-in received
+def message_text(data):
+    from email import message_from_bytes
+    message = message_from_bytes(data)
+    part = message.get_payload(0) if message.is_multipart() else message
+    return part.get_payload(decode=True).decode(part.get_content_charset() or 'utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Email outbox tools")
+    parser.add_argument('--stats', action='store_true', help="print the outbox queue depth and send latency")
+    parser.add_argument('--stand-in', type=int, metavar='PORT',
+                        help="run a local SMTP stand-in on this port and print what it receives")
+    args = parser.parse_args()
+
+    if args.stats:
+        stats = Outbox(UserDatabase(DB_PATH).migrate()).stats()
+        for name, value in stats.items():
+            print(f"{name:<16} {value:,.3f}" if isinstance(value, float) else f"{name:<16} {value:,}")
+    if args.stand_in is not None:
+        server = LocalSMTPServer(port=args.stand_in).start()
+        print(f"SMTP stand-in on 127.0.0.1:{server.port} (USER_SMTP_HOST=127.0.0.1 "
+              f"USER_SMTP_PORT={server.port} USER_SMTP_STARTTLS=0)")
+        seen = 0
+        try:
+            while True:
+                time.sleep(0.5)
+                for recipients, data in server.messages[seen:]:
+                    print(f"to {', '.join(recipients)}: {message_text(data).strip()[:200]!r}")
+                seen = len(server.messages)
+        except KeyboardInterrupt:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()